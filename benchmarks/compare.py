@@ -0,0 +1,44 @@
+import argparse
+import json
+import sys
+
+
+def load_results(path: str):
+    with open(path, 'r') as f:
+        report = json.load(f)
+    return report["meta"], {(r["name"], r["size"]): r for r in report["results"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative throughput change reported as a regression or improvement")
+    args = parser.parse_args(argv)
+    
+    base_meta, baseline = load_results(args.baseline)
+    cand_meta, candidate = load_results(args.candidate)
+    print(f"baseline  {base_meta.get('commit')}\ncandidate {cand_meta.get('commit')}\n")
+    print(f"{'benchmark':<28} {'size':>9} {'baseline':>14} {'candidate':>14} {'change':>9}")
+    
+    regressions = 0
+    for key in sorted(set(baseline) & set(candidate)):
+        old = baseline[key].get("throughput")
+        new = candidate[key].get("throughput")
+        if not old or not new:
+            continue
+        change = (new - old) / old
+        flag = ""
+        if change <= -args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change >= args.threshold:
+            flag = "  improved"
+        print(f"{key[0]:<28} {key[1]:>9} {old:>14.2f} {new:>14.2f} {change:>+8.1%}{flag}")
+    
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import random
+from typing import Iterator, List, Tuple
+
+
+FIRST_NAMES = [
+    "Alice", "Bob", "Carol", "David", "Erin", "Frank", "Grace", "Henry", "Irene", "Jack",
+    "Karen", "Liam", "Maria", "Nora", "Oscar", "Paula", "Quinn", "Rosa", "Sam", "Tara",
+    "Uma", "Victor", "Wendy", "Xavier", "Yara", "Zane", "Amir", "Bianca", "Cyrus", "Dana",
+]
+
+LAST_NAMES = [
+    "Smith", "Jones", "Brown", "Taylor", "Wilson", "Davies", "Evans", "Thomas", "Johnson", "Roberts",
+    "Walker", "Wright", "Hughes", "Green", "Hall", "Wood", "Clarke", "Turner", "Hill", "Moore",
+    "Cooper", "Ward", "Morris", "King", "Baker", "Harris", "Lewis", "Young", "Allen", "Scott",
+]
+
+CODENAMES = [
+    "Falcon", "Orion", "Atlas", "Nimbus", "Quartz", "Ember", "Harbor", "Summit", "Cobalt", "Aurora",
+    "Beacon", "Cedar", "Delta", "Echo", "Fjord", "Granite", "Helix", "Indigo", "Juniper", "Kestrel",
+    "Lumen", "Meridian", "Nova", "Onyx", "Pioneer", "Quill", "Raven", "Sierra", "Tundra", "Vertex",
+]
+
+TOOL_WORDS = [
+    "Python", "Postgres", "Redis", "Kafka", "Docker", "Spark", "Flask", "Django", "Numpy", "Pandas",
+    "Rust", "Golang", "Kotlin", "Swift", "React", "Svelte", "Linux", "Nginx", "Terraform", "Ansible",
+]
+
+TOOL_SUFFIXES = ["Engine", "Toolkit", "Server", "Pipeline", "Studio", "Cloud", "Runtime", "Bridge"]
+
+CATEGORIES = [
+    "web application", "research project", "data platform", "mobile app", "machine learning model",
+    "internal tool", "library", "prototype", "service", "dashboard",
+]
+
+FEATURES = [
+    "tests", "documentation", "users", "dependencies", "deadlines", "metrics", "issues", "releases",
+]
+
+DOC_KINDS = ["Design Notes", "Launch Plan", "Field Report", "Roadmap", "Postmortem", "Handbook"]
+
+TEMPLATES = [
+    ("worksOn", "{person} works on {project}."),
+    ("uses", "{project} uses {tool}."),
+    ("uses", "{person} uses {tool}."),
+    ("creates", "{person} created {project}."),
+    ("relatedTo", "{project} relates to {other_project}."),
+    ("isA", "{project} is a {category}."),
+    ("has", "{project} has {feature}."),
+    ("develops", "{person} developed {tool}."),
+    ("writes", "{person} wrote {doc}."),
+]
+
+
+class SyntheticCorpus:
+    def __init__(self, num_triples: int, sentences_per_note: int = 20, seed: int = 0):
+        self.num_triples = num_triples
+        self.sentences_per_note = sentences_per_note
+        self.seed = seed
+        
+        scale = max(1, int(num_triples ** 0.5) // 10)
+        self.people = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES][:max(20, scale * 30)]
+        self.projects = [f"Project {a} {b}" for a in CODENAMES for b in CODENAMES if a != b][:max(20, scale * 30)]
+        self.tools = [f"{word} {suffix}" for word in TOOL_WORDS for suffix in TOOL_SUFFIXES][:max(10, scale * 15)]
+        self.docs = [f"{kind} {name}" for kind in DOC_KINDS for name in CODENAMES]
+    
+    def _sentence(self, rng: random.Random) -> Tuple[str, str]:
+        relation, template = rng.choice(TEMPLATES)
+        project, other_project = rng.sample(self.projects, 2)
+        sentence = template.format(
+            person=rng.choice(self.people),
+            project=project,
+            other_project=other_project,
+            tool=rng.choice(self.tools),
+            category=rng.choice(CATEGORIES),
+            feature=rng.choice(FEATURES),
+            doc=rng.choice(self.docs)
+        )
+        return relation, sentence
+    
+    def notes(self) -> Iterator[Tuple[str, str]]:
+        rng = random.Random(self.seed)
+        remaining = self.num_triples
+        index = 0
+        while remaining > 0:
+            count = min(self.sentences_per_note, remaining)
+            sentences = [self._sentence(rng)[1] for _ in range(count)]
+            yield f"note_{index:07d}.txt", " ".join(sentences)
+            remaining -= count
+            index += 1
+    
+    def queries(self, count: int) -> List[str]:
+        rng = random.Random(self.seed + 1)
+        queries = []
+        for _ in range(count):
+            relation, sentence = self._sentence(rng)
+            queries.append(sentence.rstrip("."))
+        return queries
+    
+    def entity_names(self, count: int) -> List[str]:
+        rng = random.Random(self.seed + 2)
+        pool = self.people + self.projects + self.tools
+        return [rng.choice(pool) for _ in range(count)]
@@ -0,0 +1,24 @@
+import re
+import zlib
+import numpy as np
+from typing import Optional
+
+from src.embeddings import EmbeddingStore
+
+
+class FakeEmbeddingStore(EmbeddingStore):
+    def __init__(self, data_dir: str = "data", dim: int = 256, documents=None):
+        super().__init__(data_dir=data_dir, use_openai=False, documents=documents)
+        self.dim = dim
+        self.use_openai = True
+        self.openai_client = self
+    
+    def _get_openai_embedding(self, text: str) -> Optional[np.ndarray]:
+        vec = np.zeros(self.dim)
+        for token in re.findall(r"\w+", text.lower()):
+            h = zlib.crc32(token.encode())
+            vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
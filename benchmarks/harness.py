@@ -0,0 +1,98 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    return {
+        "count": len(latencies),
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 4) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 50), 4),
+        "p95_ms": round(1000 * percentile(latencies, 95), 4),
+        "p99_ms": round(1000 * percentile(latencies, 99), 4),
+        "max_ms": round(1000 * max(latencies), 4) if latencies else 0.0
+    }
+
+
+def time_call(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def time_each(fn: Callable, items) -> List[float]:
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+class BenchmarkReport:
+    def __init__(self, config: Dict):
+        self.meta = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": config
+        }
+        self.results = []
+    
+    def add(self, name: str, size: int, seconds: float, operations: int, unit: str, **extra):
+        result = self._find(name, size)
+        if result is None:
+            result = {"name": name, "size": size, "samples": []}
+            self.results.append(result)
+        result["samples"].append(round(seconds, 6))
+        
+        median_seconds = percentile(result["samples"], 50)
+        result.update({
+            "seconds": median_seconds,
+            "operations": operations,
+            "throughput": round(operations / median_seconds, 2) if median_seconds > 0 else None,
+            "unit": unit
+        })
+        result.update(extra)
+        print(f"{name:<28} size={size:<9} {round(operations / seconds, 2) if seconds > 0 else None} {unit}")
+        return result
+    
+    def _find(self, name: str, size: int) -> Optional[Dict]:
+        for result in self.results:
+            if result["name"] == name and result["size"] == size:
+                return result
+        return None
+    
+    def to_dict(self) -> Dict:
+        return {"meta": self.meta, "results": self.results}
+    
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import hashlib
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.corpus import SyntheticCorpus
+from benchmarks.fake_embedder import FakeEmbeddingStore
+from benchmarks.harness import BenchmarkReport, latency_summary
+
+
+ENDPOINTS = ("ingest", "query", "entity", "stats")
+DEFAULT_MIX = "query=0.6,entity=0.2,stats=0.1,ingest=0.1"
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}', expected one of {', '.join(ENDPOINTS)}")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight '{weight}' for {name}")
+        if mix[name] < 0:
+            raise argparse.ArgumentTypeError(f"Weight for {name} must not be negative")
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("At least one endpoint needs a positive weight")
+    return mix
+
+
+def entity_id(name: str) -> str:
+    return hashlib.md5(name.lower().strip().encode()).hexdigest()[:16]
+
+
+def fresh_notes(size: int, seed: int) -> Iterator[Tuple[str, str]]:
+    generation = 1
+    while True:
+        for name, text in SyntheticCorpus(size, seed=seed + 1000 * generation).notes():
+            yield f"load_{generation}_{name}", text
+        generation += 1
+
+
+class Workload:
+    def __init__(self, corpus: SyntheticCorpus, mix: Dict[str, float], seed: int, pool: int, top_k: int):
+        self.rng = random.Random(seed)
+        self.endpoints = [name for name in mix if mix[name] > 0]
+        self.weights = [mix[name] for name in self.endpoints]
+        self.queries = corpus.queries(pool)
+        self.entity_ids = [entity_id(name) for name in corpus.entity_names(pool)]
+        self.notes = fresh_notes(max(corpus.num_triples, corpus.sentences_per_note), seed)
+        self.top_k = top_k
+    
+    def next(self) -> Tuple[str, str, str, Optional[Dict]]:
+        endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+        if endpoint == "ingest":
+            title, text = next(self.notes)
+            return endpoint, "POST", "/api/ingest-text", {"text": text, "title": title}
+        if endpoint == "query":
+            return endpoint, "POST", "/api/query", {"q": self.rng.choice(self.queries), "top_k": self.top_k}
+        if endpoint == "entity":
+            return endpoint, "GET", f"/api/entity/{self.rng.choice(self.entity_ids)}", None
+        return endpoint, "GET", "/api/stats", None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+        self.statuses: Dict[str, Counter] = {endpoint: Counter() for endpoint in ENDPOINTS}
+    
+    def record(self, endpoint: str, status: str, seconds: float):
+        self.statuses[endpoint][status] += 1
+        if status.startswith("2"):
+            self.latencies[endpoint].append(seconds)
+    
+    def issued(self, endpoint: str) -> int:
+        return sum(self.statuses[endpoint].values())
+
+
+async def send(client: httpx.AsyncClient, recorder: Recorder, request: Tuple, scheduled: float):
+    endpoint, method, url, body = request
+    try:
+        response = await client.request(method, url, json=body)
+        status = str(response.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    recorder.record(endpoint, status, time.perf_counter() - scheduled)
+
+
+async def open_loop(client: httpx.AsyncClient, workload: Workload, recorder: Recorder,
+                    rate: float, duration: float, rng: random.Random):
+    tasks = set()
+    start = time.perf_counter()
+    scheduled = start
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled - start >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.ensure_future(send(client, recorder, workload.next(), scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def closed_loop(client: httpx.AsyncClient, workload: Workload, recorder: Recorder,
+                      concurrency: int, duration: float):
+    deadline = time.perf_counter() + duration
+    
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, recorder, workload.next(), time.perf_counter())
+    
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+@asynccontextmanager
+async def in_process_client(args):
+    with tempfile.TemporaryDirectory(prefix="pkg-load-") as data_dir:
+        os.environ["PKG_DATA_DIR"] = data_dir
+        os.environ.pop("OPENAI_API_KEY", None)
+        
+        main = importlib.import_module("src.main")
+        api_routes = importlib.import_module("src.api_routes")
+        if args.embedder == "fake":
+            api_routes.stores.embedding_factory = (
+                lambda data_dir, documents: FakeEmbeddingStore(data_dir, documents=documents))
+        
+        async with main.lifespan(main.app):
+            await asyncio.get_running_loop().run_in_executor(None, api_routes.stores.wait)
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest",
+                                         timeout=args.timeout) as client:
+                yield client
+
+
+@asynccontextmanager
+async def remote_client(args):
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        response = await client.get("/ready")
+        if response.status_code != 200:
+            raise RuntimeError(f"Server at {args.url} is not ready: {response.text}")
+        yield client
+
+
+async def preload(client: httpx.AsyncClient, corpus: SyntheticCorpus, report: BenchmarkReport):
+    latencies = []
+    for title, text in corpus.notes():
+        start = time.perf_counter()
+        response = await client.post("/api/ingest-text", json={"text": text, "title": title})
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    report.add("load_preload", corpus.num_triples, sum(latencies), len(latencies), "requests/s",
+               latency=latency_summary(latencies))
+
+
+async def run(args, report: BenchmarkReport):
+    corpus = SyntheticCorpus(args.corpus_size, seed=args.seed)
+    workload = Workload(corpus, args.mix, args.seed, args.pool, args.top_k)
+    recorder = Recorder()
+    
+    connect = remote_client if args.url else in_process_client
+    async with connect(args) as client:
+        if not args.no_preload:
+            await preload(client, corpus, report)
+        
+        start = time.perf_counter()
+        if args.rate:
+            await open_loop(client, workload, recorder, args.rate, args.duration, random.Random(args.seed + 3))
+        else:
+            await closed_loop(client, workload, recorder, args.concurrency, args.duration)
+        elapsed = time.perf_counter() - start
+    
+    for endpoint in ENDPOINTS:
+        if recorder.issued(endpoint):
+            latencies = recorder.latencies[endpoint]
+            report.add(f"load_{endpoint}", args.corpus_size, elapsed, len(latencies), "requests/s",
+                       issued=recorder.issued(endpoint), statuses=dict(recorder.statuses[endpoint]),
+                       latency=latency_summary(latencies))
+    
+    latencies = [seconds for endpoint in ENDPOINTS for seconds in recorder.latencies[endpoint]]
+    statuses = sum(recorder.statuses.values(), Counter())
+    report.add("load_total", args.corpus_size, elapsed, len(latencies), "requests/s",
+               issued=sum(statuses.values()), statuses=dict(statuses), latency=latency_summary(latencies))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive mixed ingest and query traffic against the API.")
+    parser.add_argument("--url", help="Base URL of a running server (default: the app in-process)")
+    parser.add_argument("--embedder", choices=["tfidf", "fake"], default="fake",
+                        help="Embedding backend for the in-process app")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Open-loop Poisson arrival rate in requests/s (0 = closed loop)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop workers when --rate is 0")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of mixed traffic")
+    parser.add_argument("--corpus-size", type=int, default=2000, help="Relation sentences ingested before the run")
+    parser.add_argument("--no-preload", action="store_true", help="Skip ingesting the corpus (server already loaded)")
+    parser.add_argument("--pool", type=int, default=200, help="Distinct queries and entities to draw from")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_report.json")
+    args = parser.parse_args(argv)
+    
+    output = Path(args.output).resolve()
+    report = BenchmarkReport({**vars(args), "target": args.url or "in-process"})
+    asyncio.run(run(args, report))
+    report.write(str(output))
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.corpus import SyntheticCorpus
+from benchmarks.fake_embedder import FakeEmbeddingStore
+from benchmarks.harness import BenchmarkReport, latency_summary, time_call, time_each
+from src.embeddings import EmbeddingStore
+from src.graph_store import GraphStore
+from src.ingest import TextChunker, EntityExtractor
+
+
+def make_embedding_store(kind: str, data_dir: str) -> EmbeddingStore:
+    if kind == "fake":
+        return FakeEmbeddingStore(data_dir=data_dir)
+    if kind == "local":
+        return EmbeddingStore(data_dir=data_dir, backend="local")
+    return EmbeddingStore(data_dir=data_dir, use_openai=False)
+
+
+def run_micro(report: BenchmarkReport, size: int, args):
+    corpus = SyntheticCorpus(size, seed=args.seed)
+    notes, seconds = time_call(lambda: list(corpus.notes()))
+    report.add("corpus_generate", size, seconds, len(notes), "notes/s")
+    
+    chunker = TextChunker()
+    chunks, seconds = time_call(lambda: [c for name, text in notes for c in chunker.chunk_text(text, name)])
+    report.add("chunker", size, seconds, len(chunks), "chunks/s",
+               megabytes=round(sum(len(text) for _, text in notes) / 1e6, 3))
+    
+    extractor = EntityExtractor()
+    triples, seconds = time_call(lambda: [t for c in chunks for t in extractor.extract_triples(c)])
+    report.add("extractor", size, seconds, len(triples), "triples/s")
+    
+    with tempfile.TemporaryDirectory() as data_dir:
+        graph_store = GraphStore(data_dir=data_dir)
+        
+        def add_all():
+            for subject, predicate, obj, confidence, provenance in triples:
+                graph_store.add_triple(subject, predicate, obj, confidence, provenance)
+        
+        _, seconds = time_call(add_all)
+        report.add("graph_add_triple", size, seconds, len(triples), "triples/s",
+                   stored_triples=graph_store.get_triple_count())
+        
+        _, seconds = time_call(graph_store.save)
+        report.add("graph_save", size, seconds, graph_store.get_triple_count(), "triples/s")
+        
+        graph_store, seconds = time_call(GraphStore, data_dir=data_dir)
+        report.add("graph_load", size, seconds, graph_store.get_triple_count(), "triples/s")
+        
+        entity_ids = [graph_store.get_canonical_id(name) for name in corpus.entity_names(args.lookups)]
+        latencies = time_each(graph_store.get_entity_info, entity_ids)
+        report.add("graph_entity_info", size, sum(latencies), len(latencies), "lookups/s",
+                   latency=latency_summary(latencies))
+        
+        queries = corpus.queries(args.queries)
+        latencies = time_each(lambda q: graph_store.search_triples(q.split(), limit=5), queries)
+        report.add("graph_search_triples", size, sum(latencies), len(latencies), "queries/s",
+                   latency=latency_summary(latencies))
+        
+        all_triples = graph_store.get_all_triples()
+        if args.max_embed_docs:
+            all_triples = all_triples[:args.max_embed_docs]
+        embedding_store = make_embedding_store(args.embedder, data_dir)
+        _, seconds = time_call(embedding_store.add_snippets, all_triples)
+        report.add("embedding_add_snippets", size, seconds, len(all_triples), "triples/s",
+                   embedder=args.embedder, vectors=embedding_store.get_vector_count())
+        
+        latencies = time_each(lambda q: embedding_store.query(q, top_k=5), queries)
+        report.add("embedding_query", size, sum(latencies), len(latencies), "queries/s",
+                   embedder=args.embedder, vectors=embedding_store.get_vector_count(),
+                   latency=latency_summary(latencies))
+
+
+def run_e2e(report: BenchmarkReport, args):
+    from fastapi.testclient import TestClient
+    
+    corpus = SyntheticCorpus(args.e2e_triples, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="pkg-bench-") as data_dir:
+        os.environ["PKG_DATA_DIR"] = data_dir
+        os.environ.pop("OPENAI_API_KEY", None)
+        
+        main = importlib.import_module("src.main")
+        api_routes = importlib.import_module("src.api_routes")
+        if args.embedder == "fake":
+            api_routes.stores.embedding_factory = (
+                lambda data_dir, documents: FakeEmbeddingStore(data_dir, documents=documents))
+        
+        with TestClient(main.app) as client:
+            api_routes.stores.wait()
+            notes = list(corpus.notes())
+            latencies = time_each(
+                lambda note: client.post("/api/ingest-text", json={"text": note[1], "title": note[0]}),
+                notes
+            )
+            report.add("api_ingest_text", args.e2e_triples, sum(latencies), len(latencies), "requests/s",
+                       latency=latency_summary(latencies))
+            
+            queries = corpus.queries(args.queries)
+            latencies = time_each(lambda q: client.post("/api/query", json={"q": q, "top_k": 5}), queries)
+            report.add("api_query", args.e2e_triples, sum(latencies), len(latencies), "requests/s",
+                       latency=latency_summary(latencies))
+            
+            entity_ids = [api_routes.stores.graph_store.get_canonical_id(name)
+                          for name in corpus.entity_names(args.lookups)]
+            latencies = time_each(lambda entity_id: client.get(f"/api/entity/{entity_id}"), entity_ids)
+            report.add("api_entity", args.e2e_triples, sum(latencies), len(latencies), "requests/s",
+                       latency=latency_summary(latencies))
+            
+            latencies = time_each(lambda _: client.get("/api/stats"), range(args.lookups))
+            report.add("api_stats", args.e2e_triples, sum(latencies), len(latencies), "requests/s",
+                       latency=latency_summary(latencies))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the knowledge graph pipeline on a synthetic corpus.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="Corpus sizes in relation sentences (1000 to 1000000)")
+    parser.add_argument("--embedder", choices=["tfidf", "local", "fake"], default="tfidf")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size; the median is reported")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--max-embed-docs", type=int, default=0,
+                        help="Cap the number of triples embedded per size (0 = all)")
+    parser.add_argument("--e2e", action="store_true", help="Also benchmark the FastAPI endpoints in-process")
+    parser.add_argument("--e2e-triples", type=int, default=500)
+    parser.add_argument("--output", default="bench_report.json")
+    args = parser.parse_args(argv)
+    
+    os.environ.pop("OPENAI_API_KEY", None)
+    output = Path(args.output).resolve()
+    report = BenchmarkReport(vars(args))
+    
+    for size in args.sizes:
+        for _ in range(args.repeat):
+            run_micro(report, size, args)
+    
+    if args.e2e:
+        run_e2e(report, args)
+    
+    report.write(str(output))
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.harness import BenchmarkReport, latency_summary, time_call, time_each
+from src.embeddings import EmbeddingStore, QUANTIZATION_MODES
+
+
+def clustered_vectors(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    assignments = rng.integers(0, clusters, size=rows)
+    vectors = centers[assignments] + 0.35 * rng.normal(size=(rows, dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall(store: EmbeddingStore, queries: np.ndarray, truth: np.ndarray, k: int) -> float:
+    hits = 0
+    for query, expected in zip(queries, truth):
+        found = {doc["row"] for doc, _ in store.search_vector(query, top_k=k)}
+        hits += len(found.intersection(expected.tolist()))
+    return hits / truth.size
+
+
+def run_mode(report: BenchmarkReport, mode: str, rerank: int, vectors: np.ndarray,
+             queries: np.ndarray, truth: np.ndarray, args):
+    name = mode if mode == "none" or rerank == 0 else f"{mode}+rerank{rerank}"
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = EmbeddingStore(data_dir=data_dir, use_openai=False, quantization=mode, rerank=rerank)
+        documents = [{"text": f"vector {row}", "row": row} for row in range(len(vectors))]
+        _, seconds = time_call(store.add_vectors, documents, vectors)
+        report.add(f"vectors_build_{name}", len(vectors), seconds, len(vectors), "vectors/s")
+        
+        store.save()
+        store, seconds = time_call(EmbeddingStore, data_dir=data_dir, use_openai=False,
+                                   quantization=mode, rerank=rerank)
+        report.add(f"vectors_load_{name}", len(vectors), seconds, len(vectors), "vectors/s")
+        
+        latencies = time_each(lambda query: store.search_vector(query, top_k=args.k), queries)
+        report.add(f"vectors_query_{name}", len(vectors), sum(latencies), len(latencies), "queries/s",
+                   latency=latency_summary(latencies),
+                   recall_at_k=round(recall(store, queries, truth, args.k), 4),
+                   memory_bytes=store.get_memory_bytes(),
+                   disk_bytes=sum(path.stat().st_size for path in Path(data_dir).iterdir()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare recall, latency and memory of vector storage modes.")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536, help="1536 matches text-embedding-3-small")
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=QUANTIZATION_MODES, default=list(QUANTIZATION_MODES))
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 4],
+                        help="Candidate multipliers for the exact re-rank of quantized modes (0 = off)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_vectors.json")
+    args = parser.parse_args(argv)
+    
+    output = Path(args.output).resolve()
+    report = BenchmarkReport(vars(args))
+    
+    vectors = clustered_vectors(args.rows + args.queries, args.dim, args.clusters, args.seed)
+    vectors, queries = vectors[:args.rows], vectors[args.rows:]
+    truth = exact_top_k(vectors, queries, args.k)
+    
+    for mode in args.modes:
+        for rerank in ([0] if mode == "none" else args.rerank):
+            run_mode(report, mode, rerank, vectors, queries, truth, args)
+    
+    report.write(str(output))
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
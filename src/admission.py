@@ -0,0 +1,184 @@
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from src.metrics import REGISTRY
+
+
+ADMISSION_REJECTED = REGISTRY.counter(
+    "pkg_admission_rejected_total",
+    "Requests shed with 429 because their admission queue was full or timed out.",
+    ("request_class", "reason")
+)
+ADMISSION_WAIT = REGISTRY.histogram(
+    "pkg_admission_wait_seconds",
+    "Time requests spent queued before being admitted.",
+    ("request_class",)
+)
+COALESCED_REQUESTS = REGISTRY.counter(
+    "pkg_coalesced_requests_total",
+    "Requests answered by joining an identical in-flight computation.",
+    ("endpoint",)
+)
+
+
+class Overloaded(Exception):
+    def __init__(self, request_class: str, retry_after: int):
+        super().__init__(f"Too many {request_class} requests, retry in {retry_after}s")
+        self.request_class = request_class
+        self.retry_after = retry_after
+
+
+class RequestClass:
+    def __init__(self, name: str, concurrency: int, queue_size: int, priority: int = 0,
+                 timeout: float = 30.0):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.priority = priority
+        self.timeout = timeout
+        self.active = 0
+        self.waiters = deque()
+        self.service_seconds = 0.1
+    
+    def retry_after(self) -> int:
+        backlog = (len(self.waiters) + self.active) / self.concurrency
+        return max(1, math.ceil(backlog * self.service_seconds))
+    
+    def record(self, seconds: float):
+        self.service_seconds += 0.2 * (seconds - self.service_seconds)
+
+
+class AdmissionController:
+    def __init__(self, classes: Iterable[RequestClass]):
+        self.classes = {request_class.name: request_class for request_class in classes}
+        self._by_priority = sorted(self.classes.values(), key=lambda request_class: request_class.priority)
+        
+        active = REGISTRY.gauge("pkg_admission_active", "Requests currently admitted.", ("request_class",))
+        queued = REGISTRY.gauge("pkg_admission_queued", "Requests waiting for admission.", ("request_class",))
+        for request_class in self.classes.values():
+            active.set_function(lambda c=request_class: c.active, request_class=request_class.name)
+            queued.set_function(lambda c=request_class: len(c.waiters), request_class=request_class.name)
+    
+    def _blocked(self, request_class: RequestClass) -> bool:
+        return any(other.waiters for other in self._by_priority if other.priority < request_class.priority)
+    
+    def _dispatch(self):
+        for request_class in self._by_priority:
+            while request_class.waiters and request_class.active < request_class.concurrency:
+                if self._blocked(request_class):
+                    return
+                request_class.active += 1
+                request_class.waiters.popleft().set_result(None)
+    
+    async def acquire(self, name: str) -> RequestClass:
+        request_class = self.classes[name]
+        if (request_class.active < request_class.concurrency and not request_class.waiters
+                and not self._blocked(request_class)):
+            request_class.active += 1
+            ADMISSION_WAIT.observe(0.0, request_class=name)
+            return request_class
+        
+        if len(request_class.waiters) >= request_class.queue_size:
+            ADMISSION_REJECTED.inc(request_class=name, reason="queue_full")
+            raise Overloaded(name, request_class.retry_after())
+        
+        waiter = asyncio.get_running_loop().create_future()
+        request_class.waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), request_class.timeout)
+        except BaseException as e:
+            if waiter.done():
+                self.release(request_class)
+            else:
+                waiter.cancel()
+                request_class.waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                ADMISSION_REJECTED.inc(request_class=name, reason="timeout")
+                raise Overloaded(name, request_class.retry_after())
+            raise
+        ADMISSION_WAIT.observe(time.perf_counter() - start, request_class=name)
+        return request_class
+    
+    def release(self, request_class: RequestClass, seconds: Optional[float] = None):
+        request_class.active -= 1
+        if seconds is not None:
+            request_class.record(seconds)
+        self._dispatch()
+    
+    @asynccontextmanager
+    async def slot(self, name: str):
+        request_class = await self.acquire(name)
+        start = time.perf_counter()
+        try:
+            yield request_class
+        finally:
+            self.release(request_class, time.perf_counter() - start)
+
+
+class SingleFlight:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+    
+    def __len__(self) -> int:
+        return len(self._calls)
+    
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable]):
+        future = self._calls.get(key)
+        if future is not None:
+            COALESCED_REQUESTS.inc(endpoint=self.endpoint)
+            return await asyncio.shield(future)
+        
+        future = asyncio.ensure_future(fn())
+        self._calls[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return await asyncio.shield(future)
+    
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController, routes: Iterable[Tuple[str, str, str]]):
+        self.app = app
+        self.controller = controller
+        self.routes = list(routes)
+    
+    def classify(self, method: str, path: str) -> Optional[str]:
+        for route_method, prefix, name in self.routes:
+            if method == route_method and path.startswith(prefix):
+                return name
+        return None
+    
+    async def __call__(self, scope, receive, send):
+        name = self.classify(scope.get("method", ""), scope.get("path", "")) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        
+        try:
+            async with self.controller.slot(name):
+                await self.app(scope, receive, send)
+        except Overloaded as e:
+            await send_overloaded(send, e)
+
+
+async def send_overloaded(send, error: Overloaded):
+    body = json.dumps({"detail": str(error)}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(error.retry_after).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
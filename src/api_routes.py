@@ -1,24 +1,97 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import json
+import os
+import heapq
+from itertools import chain
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
-import tempfile
 
-from src.graph_store import GraphStore
-from src.embeddings import EmbeddingStore
-from src.ingest import Ingester
+from src.admission import AdmissionController, RequestClass, SingleFlight
+from src.graph_query import PatternQuery, parse_where
+from src.metrics import REGISTRY
+from src.profiling import ProfiledRoute, PROFILES, SLOW_LOG, run_in_worker
+from src.shards import DEFAULT_NAMESPACE, ShardManager
+from src.store_manager import StoreManager
 
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-graph_store = GraphStore()
-embedding_store = EmbeddingStore()
-ingester = Ingester(graph_store)
+stores = StoreManager(data_dir=os.getenv("PKG_DATA_DIR", "data"),
+                      poll_seconds=float(os.getenv("PKG_MANIFEST_POLL_SECONDS", "1")),
+                      compact_ratio=float(os.getenv("PKG_COMPACT_RATIO", "0.3")),
+                      analytics_delay=float(os.getenv("PKG_ANALYTICS_DELAY_SECONDS", "5")))
+shards = ShardManager(stores, max_loaded=int(os.getenv("PKG_MAX_LOADED_SHARDS", "8")),
+                      query_threads=int(os.getenv("PKG_QUERY_THREADS", "0")) or None)
+admission = AdmissionController([
+    RequestClass("read", concurrency=int(os.getenv("PKG_READ_CONCURRENCY", "8")),
+                 queue_size=int(os.getenv("PKG_READ_QUEUE", "64")), priority=0,
+                 timeout=float(os.getenv("PKG_ADMISSION_TIMEOUT_SECONDS", "30"))),
+    RequestClass("write", concurrency=int(os.getenv("PKG_WRITE_CONCURRENCY", "2")),
+                 queue_size=int(os.getenv("PKG_WRITE_QUEUE", "16")), priority=1,
+                 timeout=float(os.getenv("PKG_ADMISSION_TIMEOUT_SECONDS", "30")))
+])
+ADMISSION_ROUTES = [
+    ("POST", "/api/ingest", "write"),
+    ("DELETE", "/api/sources/", "write"),
+    ("DELETE", "/api/triples", "write"),
+    ("POST", "/api/entities/", "write"),
+    ("POST", "/api/compact", "write"),
+    ("POST", "/api/analytics/refresh", "write"),
+    ("POST", "/api/graph/match", "read"),
+    ("GET", "/api/entity/", "read"),
+    ("GET", "/api/documents/", "read")
+]
+queries = SingleFlight("query")
+STORE_WAIT_SECONDS = float(os.getenv("PKG_STORE_WAIT_SECONDS", "10"))
+MAX_MATCH_LIMIT = int(os.getenv("PKG_MAX_MATCH_LIMIT", "10000"))
+MAX_CONTEXT_CHARS = int(os.getenv("PKG_MAX_CONTEXT_CHARS", "2000"))
+CENTRALITY_WEIGHT = float(os.getenv("PKG_CENTRALITY_WEIGHT", "0.2"))
+CENTRALITY_CANDIDATES = 2
+EMBEDDING_METHODS = {"openai": "OpenAI", "tfidf": "TF-IDF", "local": "Local LSA"}
+
+STORE_SIZE = REGISTRY.gauge("pkg_store_size", "Current size of the knowledge stores.", ("kind",))
+for _kind in ("triples", "entities", "vectors"):
+    STORE_SIZE.set_function(lambda kind=_kind: stores.get_sizes()[kind], kind=_kind)
+REGISTRY.gauge(
+    "pkg_ingest_queue_depth", "Ingestion jobs queued or in progress."
+).set_function(lambda: stores.ingester.get_active_job_count() if stores.is_ready() else 0)
+REGISTRY.gauge("pkg_stores_ready", "1 once the stores have finished loading.").set_function(
+    lambda: 1 if stores.is_ready() else 0
+)
+
+SLOW_LOG.store_sizes = stores.get_sizes
+
+
+def _get_shard(namespace: str, create: bool = False) -> StoreManager:
+    try:
+        return shards.get(namespace, create=create)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Namespace '{namespace}' not found")
+
+
+async def _wait_ready(manager: StoreManager) -> StoreManager:
+    if not manager.is_ready():
+        ready = await run_in_threadpool(manager.wait, STORE_WAIT_SECONDS)
+        if not ready:
+            detail = "Stores failed to load" if manager.status == "failed" else "Stores are still loading"
+            raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+    return manager
+
+
+async def get_stores(namespace: str = DEFAULT_NAMESPACE) -> StoreManager:
+    return await _wait_ready(_get_shard(namespace))
 
 
 class QueryRequest(BaseModel):
     q: str
     top_k: int = 5
+    namespaces: Optional[List[str]] = None
+    context: int = 0
 
 
 class QueryResponse(BaseModel):
@@ -26,44 +99,69 @@ class QueryResponse(BaseModel):
     results: List[dict]
 
 
+class MergeEntitiesRequest(BaseModel):
+    source_id: str
+    target_id: str
+
+
+class ResolveEntitiesRequest(BaseModel):
+    threshold: Optional[float] = None
+    dry_run: bool = True
+
+
+class GraphMatchRequest(BaseModel):
+    where: Optional[str] = None
+    patterns: Optional[List[List[str]]] = None
+    limit: int = 100
+    explain: bool = False
+
+
 class IngestTextRequest(BaseModel):
     text: str
     title: Optional[str] = "pasted_text"
+    namespace: str = DEFAULT_NAMESPACE
+
+
+def _run_ingest(s: StoreManager, job_id: str, items: List[Tuple[str, str]]) -> int:
+    with s.writing():
+        start_row = s.graph_store.get_row_count()
+        total_triples = 0
+        for name, text_content in items:
+            total_triples += s.ingester.ingest_file(Path(name), text_content, job_id)
+        
+        triples = s.graph_store.get_triples_since(start_row)
+        if triples:
+            s.embedding_store.add_snippets(triples)
+        
+        with s.committing(("graph", "vectors")):
+            if triples:
+                s.embedding_store.save()
+            s.ingester.finalize_job(job_id)
+    
+    if total_triples:
+        s.schedule_analytics()
+    return total_triples
 
 
 @router.post("/ingest")
-async def ingest_files(files: List[UploadFile] = File(...)):
-    job_id = ingester.create_job()
+async def ingest_files(files: List[UploadFile] = File(...), namespace: str = Form(DEFAULT_NAMESPACE)):
+    s = await _wait_ready(_get_shard(namespace, create=True))
+    job_id = s.ingester.create_job()
     
-    total_triples = 0
+    items = []
     for file in files:
         content = await file.read()
         try:
             text_content = content.decode('utf-8')
         except UnicodeDecodeError:
             continue
-        
-        triples_count = ingester.ingest_file(Path(file.filename), text_content, job_id)
-        total_triples += triples_count
-    
-    all_triples = graph_store.get_all_triples()
-    documents = []
-    for triple in all_triples:
-        doc = {
-            "text": f"{triple['subject']} {triple['predicate']} {triple['object']}. {triple['provenance']['snippet']}",
-            "triple_key": f"{triple['subject']}:{triple['predicate']}:{triple['object']}",
-            "provenance": triple['provenance']
-        }
-        documents.append(doc)
+        items.append((file.filename, text_content))
     
-    if documents:
-        embedding_store.add_documents(documents)
-        embedding_store.save()
-    
-    ingester.finalize_job(job_id)
+    total_triples = await run_in_worker(_run_ingest, s, job_id, items)
     
     return {
         "job_id": job_id,
+        "namespace": namespace,
         "status": "done",
         "triples": total_triples
     }
@@ -71,36 +169,104 @@ async def ingest_files(files: List[UploadFile] = File(...)):
 
 @router.post("/ingest-text")
 async def ingest_text(request: IngestTextRequest):
-    job_id = ingester.create_job()
+    s = await _wait_ready(_get_shard(request.namespace, create=True))
+    job_id = s.ingester.create_job()
     
-    triples_count = ingester.ingest_file(Path(request.title), request.text, job_id)
-    
-    all_triples = graph_store.get_all_triples()
-    documents = []
-    for triple in all_triples:
-        doc = {
-            "text": f"{triple['subject']} {triple['predicate']} {triple['object']}. {triple['provenance']['snippet']}",
-            "triple_key": f"{triple['subject']}:{triple['predicate']}:{triple['object']}",
-            "provenance": triple['provenance']
-        }
-        documents.append(doc)
-    
-    if documents:
-        embedding_store.add_documents(documents)
-        embedding_store.save()
-    
-    ingester.finalize_job(job_id)
+    triples_count = await run_in_worker(_run_ingest, s, job_id, [(request.title, request.text)])
     
     return {
         "job_id": job_id,
+        "namespace": request.namespace,
         "status": "done",
         "triples": triples_count
     }
 
 
+def _run_delete(s: StoreManager, delete: Callable) -> Dict:
+    with s.writing():
+        triples = delete(s.graph_store)
+        vectors = s.embedding_store.delete_triples(triples) if triples else 0
+        if triples:
+            with s.committing(("graph", "vectors")):
+                s.graph_store.save()
+                s.embedding_store.save()
+    
+    if triples:
+        s.schedule_analytics()
+    s.maybe_compact()
+    return {"deleted_triples": len(triples), "deleted_vectors": vectors}
+
+
+@router.delete("/sources/{source:path}")
+async def delete_source(source: str, s: StoreManager = Depends(get_stores)):
+    result = await run_in_worker(_run_delete, s, lambda graph_store: graph_store.delete_source(source))
+    if not result["deleted_triples"]:
+        raise HTTPException(status_code=404, detail="Source not found")
+    return result
+
+
+@router.delete("/triples")
+async def delete_triple(subject: str, predicate: str, object: str, s: StoreManager = Depends(get_stores)):
+    result = await run_in_worker(
+        _run_delete, s, lambda graph_store: graph_store.delete_triple(subject, predicate, object)
+    )
+    if not result["deleted_triples"]:
+        raise HTTPException(status_code=404, detail="Triple not found")
+    return result
+
+
+def _run_merge(s: StoreManager, source_id: str, target_id: str) -> int:
+    with s.writing():
+        moved = s.graph_store.merge_entities(source_id, target_id)
+        if moved:
+            with s.committing(("graph",)):
+                s.graph_store.save()
+    
+    if moved:
+        s.schedule_analytics()
+    s.maybe_compact()
+    return moved
+
+
+@router.post("/entities/merge")
+async def merge_entities(request: MergeEntitiesRequest, s: StoreManager = Depends(get_stores)):
+    if s.graph_store.get_entity_info(request.source_id) is None or s.graph_store.get_entity_info(request.target_id) is None:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    
+    moved = await run_in_worker(_run_merge, s, request.source_id, request.target_id)
+    return {"source_id": request.source_id, "target_id": request.target_id, "moved_triples": moved}
+
+
+def _run_resolve(s: StoreManager, threshold: Optional[float], dry_run: bool) -> List[dict]:
+    with s.writing():
+        merges = s.graph_store.resolve_entities(threshold=threshold, dry_run=dry_run)
+        if merges and not dry_run:
+            with s.committing(("graph",)):
+                s.graph_store.save()
+    
+    if merges and not dry_run:
+        s.schedule_analytics()
+    s.maybe_compact()
+    return merges
+
+
+@router.post("/entities/resolve")
+async def resolve_entities(request: ResolveEntitiesRequest, s: StoreManager = Depends(get_stores)):
+    if request.threshold is not None and not 0 < request.threshold <= 1:
+        raise HTTPException(status_code=400, detail="threshold must be in (0, 1]")
+    
+    merges = await run_in_worker(_run_resolve, s, request.threshold, request.dry_run)
+    return {"dry_run": request.dry_run, "merged": len(merges), "merges": merges}
+
+
+@router.post("/compact")
+async def compact_stores(s: StoreManager = Depends(get_stores)):
+    return await run_in_worker(s.compact)
+
+
 @router.get("/jobs/{job_id}")
-async def get_job_status(job_id: str):
-    job = ingester.get_job(job_id)
+async def get_job_status(job_id: str, s: StoreManager = Depends(get_stores)):
+    job = s.ingester.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
@@ -113,24 +279,97 @@ async def get_job_status(job_id: str):
     }
 
 
+def _expand_hits(hits: List[Tuple[dict, float]], namespace: str, top_k: int, graph_store=None) -> List:
+    results = []
+    for doc, score in hits:
+        if "triples" not in doc:
+            results.append((doc, score, namespace))
+            continue
+        provenance = doc["provenance"]
+        if "snippet" not in provenance:
+            provenance = dict(provenance, snippet=doc["text"])
+        for triple in doc["triples"]:
+            boosted = score
+            if graph_store is not None:
+                boosted *= 1 + CENTRALITY_WEIGHT * max(graph_store.entity_centrality(triple["subject"]),
+                                                       graph_store.entity_centrality(triple["object"]))
+            results.append(({"text": f"{triple['subject']} {triple['predicate']} {triple['object']}",
+                             "provenance": provenance}, boosted, namespace))
+    if graph_store is not None:
+        return heapq.nlargest(top_k, results, key=lambda item: item[1])
+    return results[:top_k]
+
+
+def _with_context(results: List, documents, radius: int) -> List:
+    if not radius:
+        return results
+    expanded = []
+    for doc, score, namespace in results:
+        provenance = doc.get("provenance", {})
+        if provenance.get("document", -1) >= 0:
+            doc = dict(doc, context=dict(documents.context(provenance["document"], provenance["start"],
+                                                           provenance["end"], radius),
+                                         document=provenance["document"]))
+        expanded.append((doc, score, namespace))
+    return expanded
+
+
+def _semantic_search(q: str, top_k: int, context: int = 0) -> Callable[[StoreManager], List]:
+    def search(s: StoreManager) -> List:
+        graph_store = s.graph_store if CENTRALITY_WEIGHT > 0 and s.graph_store.centrality is not None else None
+        candidates = top_k * CENTRALITY_CANDIDATES if graph_store is not None else top_k
+        results = _expand_hits(s.embedding_store.query(q, top_k=candidates), shards.namespace_of(s), top_k,
+                               graph_store)
+        return _with_context(results, s.graph_store.documents, context)
+    return search
+
+
+def _keyword_search(q: str, top_k: int, context: int = 0) -> Callable[[StoreManager], List]:
+    def search(s: StoreManager) -> List:
+        namespace = shards.namespace_of(s)
+        results = [({"text": f"{t['subject']} {t['predicate']} {t['object']}",
+                     "provenance": t['provenance']}, 0.5, namespace)
+                   for t in s.graph_store.search_triples(q.split(), limit=top_k)]
+        return _with_context(results, s.graph_store.documents, context)
+    return search
+
+
 @router.post("/query")
 async def query_graph(request: QueryRequest):
-    results = embedding_store.query(request.q, top_k=request.top_k)
+    namespaces = request.namespaces or [DEFAULT_NAMESPACE]
+    if "*" in namespaces:
+        namespaces = shards.namespaces()
+    namespaces = list(dict.fromkeys(namespaces))
+    if not 0 <= request.context <= MAX_CONTEXT_CHARS:
+        raise HTTPException(status_code=400, detail=f"context must be between 0 and {MAX_CONTEXT_CHARS}")
     
-    if not results:
-        keyword_results = graph_store.search_triples(request.q.split())
-        results = [({"text": f"{t['subject']} {t['predicate']} {t['object']}", 
-                     "provenance": t['provenance']}, 0.5) 
-                   for t in keyword_results[:request.top_k]]
+    key = (request.q, request.top_k, tuple(sorted(namespaces)), request.context)
+    return await queries.run(key, lambda: _answer_query(request.q, request.top_k, namespaces, request.context))
+
+
+async def _answer_query(q: str, top_k: int, namespaces: List[str], context: int = 0) -> QueryResponse:
+    managers = [await _wait_ready(_get_shard(namespace)) for namespace in namespaces]
+    
+    async with admission.slot("read"):
+        partials = await run_in_worker(shards.fan_out, managers, _semantic_search(q, top_k, context))
+        results = heapq.nlargest(top_k, chain.from_iterable(partials), key=lambda item: item[1])
+        
+        if not results:
+            partials = await run_in_worker(shards.fan_out, managers, _keyword_search(q, top_k, context))
+            results = list(chain.from_iterable(partials))[:top_k]
     
     formatted_results = []
-    for doc, score in results:
-        formatted_results.append({
+    for doc, score, namespace in results:
+        result = {
             "text": doc.get("text", ""),
+            "namespace": namespace,
             "source": doc.get("provenance", {}).get("source", "unknown"),
             "snippet": doc.get("provenance", {}).get("snippet", ""),
             "score": round(score, 3)
-        })
+        }
+        if "context" in doc:
+            result["context"] = doc["context"]
+        formatted_results.append(result)
     
     answer = ""
     if formatted_results:
@@ -143,19 +382,124 @@ async def query_graph(request: QueryRequest):
 
 
 @router.get("/entity/{entity_id}")
-async def get_entity(entity_id: str):
-    entity_info = graph_store.get_entity_info(entity_id)
+async def get_entity(entity_id: str, limit: Optional[int] = None, s: StoreManager = Depends(get_stores)):
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    entity_info = s.graph_store.get_entity_info(entity_id, limit=limit)
     if not entity_info:
         raise HTTPException(status_code=404, detail="Entity not found")
     
     return entity_info
 
 
+@router.get("/documents/{document_id}")
+async def get_document(document_id: int, start: int = 0, end: Optional[int] = None,
+                       s: StoreManager = Depends(get_stores)):
+    documents = s.graph_store.documents
+    if not 0 <= document_id < len(documents):
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    length = documents.length(document_id)
+    start = max(0, start)
+    end = length if end is None else min(end, length)
+    return {
+        "document": document_id,
+        "source": documents.source(document_id),
+        "length": length,
+        "start": start,
+        "end": end,
+        "text": documents.text(document_id, start, end)
+    }
+
+
+@router.get("/analytics")
+async def get_analytics(s: StoreManager = Depends(get_stores)):
+    centrality = s.graph_store.centrality
+    if centrality is None:
+        return {"status": "pending"}
+    return {"status": "ready", **centrality.summary()}
+
+
+@router.post("/analytics/refresh")
+async def refresh_analytics(s: StoreManager = Depends(get_stores)):
+    return {"status": "ready", **await run_in_worker(s.refresh_analytics)}
+
+
+@router.post("/graph/match")
+async def match_graph(request: GraphMatchRequest, s: StoreManager = Depends(get_stores)):
+    if not 0 < request.limit <= MAX_MATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_MATCH_LIMIT}")
+    try:
+        patterns = list(request.patterns or []) + (parse_where(request.where) if request.where else [])
+        query = PatternQuery(s.graph_store, patterns)
+        steps = query.plan(request.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if request.explain:
+        return {"variables": query.variables, "plan": [step.to_dict() for step in steps]}
+    
+    def lines():
+        for binding in query.execute(limit=request.limit, steps=steps):
+            yield json.dumps(query.render(binding)) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/stats")
-async def get_stats():
+async def get_stats(detailed: bool = False, s: StoreManager = Depends(get_stores)):
+    graph_stats = s.graph_store.get_stats(detailed=detailed)
+    stats = {
+        "total_triples": graph_stats["triples"],
+        "total_entities": graph_stats["entities"],
+        "total_vectors": s.embedding_store.get_vector_count(),
+        "embedding_method": EMBEDDING_METHODS["openai" if s.embedding_store.use_openai else s.embedding_store.backend]
+    }
+    if detailed:
+        stats["total_predicates"] = graph_stats["predicates"]
+        stats["total_sources"] = graph_stats["sources"]
+        stats["predicate_counts"] = graph_stats["predicate_counts"]
+        stats["source_counts"] = graph_stats["source_counts"]
+        stats["documents"] = s.graph_store.documents.get_stats()
+    return stats
+
+
+@router.get("/export")
+async def export_graph(format: str = "turtle", s: StoreManager = Depends(get_stores)):
+    if format == "turtle":
+        return StreamingResponse(s.graph_store.iter_turtle(), media_type="text/turtle",
+                                 headers={"Content-Disposition": "attachment; filename=graph.ttl"})
+    if format == "json":
+        return StreamingResponse(s.graph_store.iter_json(), media_type="application/json",
+                                 headers={"Content-Disposition": "attachment; filename=provenance.json"})
+    raise HTTPException(status_code=400, detail="format must be 'turtle' or 'json'")
+
+
+@router.get("/namespaces")
+async def list_namespaces():
+    return {
+        "namespaces": shards.namespaces(),
+        "loaded": shards.loaded()
+    }
+
+
+@router.get("/debug/profiles")
+async def list_profiles():
+    return {"profiles": PROFILES.list()}
+
+
+@router.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    profile = PROFILES.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return profile
+
+
+@router.get("/debug/slow-requests")
+async def get_slow_requests():
     return {
-        "total_triples": graph_store.get_triple_count(),
-        "total_entities": len(set([t.split(":")[0] for t in graph_store.provenance_store.keys()] + 
-                                   [t.split(":")[2] for t in graph_store.provenance_store.keys()])),
-        "embedding_method": "OpenAI" if embedding_store.use_openai else "TF-IDF"
+        "threshold_ms": SLOW_LOG.threshold_ms,
+        "requests": list(SLOW_LOG.entries)
     }
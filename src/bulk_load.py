@@ -0,0 +1,205 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.ingest import INGESTED_ITEMS, EntityExtractor, TextChunker
+from src.metrics import timed
+from src.shards import DEFAULT_NAMESPACE, ShardManager
+from src.store_manager import StoreManager
+
+
+DEFAULT_EXTENSIONS = (".txt", ".md")
+
+_chunker = TextChunker()
+_extractor = EntityExtractor()
+
+
+def find_files(root: Path, extensions: Iterable[str]) -> Iterator[Tuple[Path, str]]:
+    extensions = {extension.lower() for extension in extensions}
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = Path(directory) / filename
+            if path.suffix.lower() in extensions:
+                yield path, path.relative_to(root).as_posix()
+
+
+def read_file(item: Tuple[Path, str]) -> Optional[Tuple[str, str]]:
+    path, name = item
+    try:
+        return name, path.read_bytes().decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    except OSError as e:
+        print(f"Failed to read {path}: {e}")
+        return None
+
+
+def extract_file(item: Tuple[str, str]) -> Tuple[str, str, int, int, list]:
+    name, text = item
+    chunks = _chunker.chunk_text(text, name)
+    triples = [triple for chunk in chunks for triple in _extractor.extract_triples(chunk)]
+    return name, _chunker.normalize(text), len(text), len(chunks), triples
+
+
+def pipelined(executor: Optional[Executor], fn: Callable, items: Iterable, window: int) -> Iterator:
+    if executor is None:
+        yield from map(fn, items)
+        return
+    
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class BulkLoader:
+    def __init__(self, manager: StoreManager, io_threads: int = 8, workers: int = 0,
+                 window: int = 64, embed: bool = True):
+        self.manager = manager
+        self.io_threads = io_threads
+        self.workers = workers or os.cpu_count() or 1
+        self.window = window
+        self.embed = embed
+        self.stats = {"files": 0, "skipped": 0, "bytes": 0, "chunks": 0, "triples": 0, "vectors": 0}
+        self.seconds: Dict[str, float] = {}
+    
+    def _stage(self, name: str, start: float) -> float:
+        now = time.perf_counter()
+        self.seconds[name] = round(now - start, 3)
+        return now
+    
+    def load(self, root: Path, extensions: Iterable[str] = DEFAULT_EXTENSIONS) -> Dict:
+        s = self.manager
+        started = time.perf_counter()
+        
+        io_pool = ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix="bulk-read")
+        cpu_pool = None
+        if self.workers > 1:
+            cpu_pool = ProcessPoolExecutor(max_workers=self.workers,
+                                           mp_context=multiprocessing.get_context("spawn"))
+        
+        try:
+            with s.writing():
+                graph_store = s.graph_store
+                start_row = graph_store.get_row_count()
+                
+                with timed("bulk_load", "extract"), graph_store.bulk_load():
+                    files = pipelined(io_pool, read_file, find_files(root, extensions), self.window)
+                    for name, text, size, chunks, triples in pipelined(cpu_pool, extract_file,
+                                                                       self._readable(files), self.window):
+                        document = graph_store.documents.add(name, text)
+                        for triple in triples:
+                            triple[4].document = document
+                        graph_store.add_triples(triples)
+                        self.stats["files"] += 1
+                        self.stats["bytes"] += size
+                        self.stats["chunks"] += chunks
+                        self.stats["triples"] += len(triples)
+                now = self._stage("extract", started)
+                
+                triples = graph_store.get_triples_since(start_row) if self.embed else []
+                if triples:
+                    with timed("bulk_load", "embed"):
+                        s.embedding_store.add_snippets(triples)
+                    self.stats["vectors"] = s.embedding_store.get_vector_count()
+                now = self._stage("embed", now)
+                
+                with timed("bulk_load", "save"), s.committing(("graph", "vectors")):
+                    graph_store.save()
+                    if triples:
+                        s.embedding_store.save()
+                now = self._stage("save", now)
+            
+            with timed("bulk_load", "analytics"):
+                s.refresh_analytics()
+            self._stage("analytics", now)
+        finally:
+            io_pool.shutdown()
+            if cpu_pool is not None:
+                cpu_pool.shutdown()
+        
+        INGESTED_ITEMS.inc(self.stats["files"], kind="files")
+        INGESTED_ITEMS.inc(self.stats["chunks"], kind="chunks")
+        INGESTED_ITEMS.inc(self.stats["triples"], kind="triples")
+        return self.report(time.perf_counter() - started)
+    
+    def _readable(self, files: Iterable[Optional[Tuple[str, str]]]) -> Iterator[Tuple[str, str]]:
+        for item in files:
+            if item is None:
+                self.stats["skipped"] += 1
+            else:
+                yield item
+    
+    def report(self, total_seconds: float) -> Dict:
+        extract_seconds = self.seconds.get("extract") or total_seconds
+        return {
+            **self.stats,
+            "seconds": dict(self.seconds, total=round(total_seconds, 3)),
+            "throughput": {
+                "files_per_second": round(self.stats["files"] / extract_seconds, 2),
+                "chunks_per_second": round(self.stats["chunks"] / extract_seconds, 2),
+                "triples_per_second": round(self.stats["triples"] / extract_seconds, 2),
+                "megabytes_per_second": round(self.stats["bytes"] / 1e6 / extract_seconds, 3),
+                "end_to_end_files_per_second": round(self.stats["files"] / total_seconds, 2)
+            },
+            "stored_triples": self.manager.graph_store.get_triple_count(),
+            "stored_vectors": self.manager.embedding_store.get_vector_count()
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-load a directory of notes straight into the stores.")
+    parser.add_argument("directory", help="Directory to walk for notes")
+    parser.add_argument("--data-dir", default=os.getenv("PKG_DATA_DIR", "data"))
+    parser.add_argument("--namespace", default=DEFAULT_NAMESPACE)
+    parser.add_argument("--extensions", nargs="+", default=list(DEFAULT_EXTENSIONS))
+    parser.add_argument("--io-threads", type=int, default=8, help="Threads reading files")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Processes chunking and extracting (default: CPU count, 1 = in-process)")
+    parser.add_argument("--window", type=int, default=64, help="Files in flight per pipeline stage")
+    parser.add_argument("--no-embed", action="store_true", help="Skip building vectors for the new triples")
+    parser.add_argument("--report", help="Write the throughput report as JSON to this path")
+    args = parser.parse_args(argv)
+    
+    root = Path(args.directory)
+    if not root.is_dir():
+        print(f"Not a directory: {root}")
+        return 2
+    
+    shards = ShardManager(StoreManager(data_dir=args.data_dir, poll_seconds=0), max_loaded=1)
+    try:
+        try:
+            manager = shards.get(args.namespace, create=True)
+        except ValueError as e:
+            print(str(e))
+            return 2
+        if not manager.wait():
+            print(f"Failed to load stores: {manager.error}")
+            return 1
+        
+        loader = BulkLoader(manager, io_threads=args.io_threads, workers=args.workers,
+                            window=args.window, embed=not args.no_embed)
+        report = loader.load(root, args.extensions)
+    finally:
+        shards.stop()
+    
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
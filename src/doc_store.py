@@ -0,0 +1,229 @@
+import os
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.metrics import CACHE_REQUESTS, timed
+from src.snapshot import SnapshotReader, StringColumn, write_snapshot
+
+
+BLOCK_CHARS = 64 * 1024
+
+
+class BlockFile:
+    __slots__ = ("path", "generation", "offsets", "sizes", "starts", "fd")
+    
+    def __init__(self, path: Path, generation: int, offsets: Optional[array] = None,
+                 sizes: Optional[array] = None, starts: Optional[array] = None):
+        self.path = path
+        self.generation = generation
+        self.offsets = offsets if offsets is not None else array('q')
+        self.sizes = sizes if sizes is not None else array('q')
+        self.starts = starts if starts is not None else array('q')
+        self.fd = os.open(path, os.O_RDONLY) if path.exists() else None
+    
+    def read(self, block: int) -> bytes:
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDONLY)
+        return os.pread(self.fd, self.sizes[block], self.offsets[block])
+    
+    def __del__(self):
+        if self.fd is not None:
+            os.close(self.fd)
+
+
+class DocumentStore:
+    def __init__(self, data_dir: str = "data", block_chars: int = BLOCK_CHARS, level: int = 6,
+                 cache_blocks: int = 16):
+        self.data_dir = Path(data_dir)
+        self.index_path = self.data_dir / "documents.idx"
+        self.block_chars = block_chars
+        self.level = level
+        self.cache_blocks = cache_blocks
+        
+        self._doc_source: List[str] = []
+        self._state: Tuple[BlockFile, array, array, int, str] = (
+            BlockFile(self._blocks_path(0), 0), array('q'), array('q'), 0, ""
+        )
+        self._saved = (0, 0)
+        
+        self._cache = OrderedDict()
+        self._recent = (None, 0, 0, "")
+        self._cache_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        
+        if self.index_path.exists():
+            self._load()
+    
+    def _blocks_path(self, generation: int) -> Path:
+        return self.data_dir / f"documents.{generation}.blk"
+    
+    def _load(self):
+        reader = SnapshotReader(self.index_path)
+        flushed, generation = reader.array("meta")
+        self._doc_source = StringColumn(reader.strings("doc_source"))
+        blocks = BlockFile(self._blocks_path(generation), generation, reader.array("block_offsets"),
+                           reader.array("block_sizes"), reader.array("block_starts"))
+        self._state = (blocks, reader.array("doc_start"), reader.array("doc_length"), flushed, "")
+        self._saved = (len(self._doc_source), flushed)
+    
+    def __len__(self) -> int:
+        return len(self._doc_source)
+    
+    def source(self, document: int) -> str:
+        return self._doc_source[document]
+    
+    def length(self, document: int) -> int:
+        return self._state[2][document]
+    
+    def add(self, source: str, text: str) -> int:
+        with self._write_lock:
+            blocks, doc_start, doc_length, flushed, tail = self._state
+            document = len(doc_start)
+            doc_start.append(flushed + len(tail))
+            doc_length.append(len(text))
+            self._doc_source.append(source)
+            
+            tail += text
+            full = len(tail) - len(tail) % self.block_chars
+            if full:
+                chunks = [tail[start:start + self.block_chars] for start in range(0, full, self.block_chars)]
+                flushed = self._write_blocks(blocks, chunks, flushed)
+                tail = tail[full:]
+            self._state = (blocks, doc_start, doc_length, flushed, tail)
+            return document
+    
+    def _write_blocks(self, blocks: BlockFile, chunks: Iterable[str], flushed: int) -> int:
+        with timed("documents", "compress"), open(blocks.path, 'ab') as f:
+            offset = f.tell()
+            for chunk in chunks:
+                data = zlib.compress(chunk.encode('utf-8'), self.level)
+                f.write(data)
+                blocks.offsets.append(offset)
+                blocks.sizes.append(len(data))
+                blocks.starts.append(flushed)
+                offset += len(data)
+                flushed += len(chunk)
+        return flushed
+    
+    def text(self, document: int, start: int = 0, end: Optional[int] = None) -> str:
+        state = self._state
+        doc_start, doc_length = state[1], state[2]
+        if not 0 <= document < len(doc_length):
+            return ""
+        start = max(0, start)
+        end = doc_length[document] if end is None else min(end, doc_length[document])
+        if start >= end:
+            return ""
+        return self._read(state, doc_start[document] + start, doc_start[document] + end)
+    
+    def context(self, document: int, start: int, end: int, radius: int) -> Dict:
+        doc_length = self._state[2]
+        if not 0 <= document < len(doc_length):
+            return {"text": "", "start": 0, "end": 0}
+        start = max(0, start - radius)
+        end = min(doc_length[document], end + radius)
+        return {"text": self.text(document, start, end), "start": start, "end": end}
+    
+    def _read(self, state, lo: int, hi: int) -> str:
+        blocks, _, _, flushed, tail = state
+        recent_blocks, recent_start, recent_end, recent_text = self._recent
+        if recent_blocks is blocks and recent_start <= lo and hi <= recent_end:
+            return recent_text[lo - recent_start:hi - recent_start]
+        
+        parts = []
+        if lo < flushed:
+            stop = min(hi, flushed)
+            block = bisect_right(blocks.starts, lo) - 1
+            while block < len(blocks.starts) and blocks.starts[block] < stop:
+                block_start = blocks.starts[block]
+                text = self._block(blocks, block)
+                self._recent = (blocks, block_start, block_start + len(text), text)
+                parts.append(text[max(lo - block_start, 0):stop - block_start])
+                block += 1
+        if hi > flushed:
+            parts.append(tail[max(lo - flushed, 0):hi - flushed])
+        return "".join(parts)
+    
+    def _block(self, blocks: BlockFile, block: int) -> str:
+        key = (blocks.generation, block)
+        with self._cache_lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+        if text is not None:
+            CACHE_REQUESTS.inc(cache="document_blocks", result="hit")
+            return text
+        
+        CACHE_REQUESTS.inc(cache="document_blocks", result="miss")
+        with timed("documents", "decompress"):
+            text = zlib.decompress(blocks.read(block)).decode('utf-8')
+        with self._cache_lock:
+            self._cache[key] = text
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return text
+    
+    def save(self):
+        with self._write_lock, timed("documents", "save"):
+            blocks, doc_start, doc_length, flushed, tail = self._state
+            if tail:
+                flushed = self._write_blocks(blocks, [tail], flushed)
+                self._state = (blocks, doc_start, doc_length, flushed, "")
+            if self._saved != (len(doc_start), flushed):
+                self._write_index(blocks, flushed, doc_start, doc_length)
+                self._saved = (len(doc_start), flushed)
+    
+    def _write_index(self, blocks: BlockFile, flushed: int, doc_start: array, doc_length: array):
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        write_snapshot(self.index_path, arrays={
+            "meta": array('q', [flushed, blocks.generation]),
+            "block_offsets": blocks.offsets,
+            "block_sizes": blocks.sizes,
+            "block_starts": blocks.starts,
+            "doc_start": doc_start,
+            "doc_length": doc_length
+        }, strings={"doc_source": self._doc_source})
+    
+    def compact(self, keep: Iterable[int]) -> int:
+        with self._write_lock, timed("documents", "compact"):
+            keep = set(keep)
+            old, old_start, old_length, flushed, tail = self._state
+            live = sum(old_length[document] for document in keep if 0 <= document < len(old_length))
+            if live == flushed + len(tail):
+                return 0
+            
+            blocks = BlockFile(self._blocks_path(old.generation + 1), old.generation + 1)
+            if blocks.path.exists():
+                blocks.path.unlink()
+            doc_start, doc_length = array('q'), array('q')
+            position, pending = 0, []
+            for document in range(len(old_length)):
+                text = self.text(document) if document in keep else ""
+                doc_start.append(position)
+                doc_length.append(len(text))
+                position += len(text)
+                pending.append(text)
+            
+            stream = "".join(pending)
+            chunks = [stream[start:start + self.block_chars] for start in range(0, len(stream), self.block_chars)]
+            written = self._write_blocks(blocks, chunks, 0)
+            self._write_index(blocks, written, doc_start, doc_length)
+            
+            self._state = (blocks, doc_start, doc_length, written, "")
+            self._saved = (len(doc_start), written)
+            old.path.unlink(missing_ok=True)
+            return flushed + len(tail) - written
+    
+    def get_stats(self) -> Dict:
+        blocks, _, _, flushed, tail = self._state
+        return {
+            "documents": len(self._doc_source),
+            "characters": flushed + len(tail),
+            "blocks": len(blocks.starts),
+            "compressed_bytes": sum(blocks.sizes)
+        }
@@ -1,26 +1,163 @@
 import os
+import re
 import json
 import pickle
+import threading
 import numpy as np
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from src.local_embeddings import LocalEncoder
+from src.metrics import REGISTRY, CACHE_REQUESTS, timed
+from src.quantization import QUANTIZERS, BLOCK_ROWS
+
+
+EMBEDDING_REQUESTS = REGISTRY.counter(
+    "pkg_embedding_requests_total",
+    "Texts sent to the embedding backend.",
+    ("backend",)
+)
+
+EMBEDDING_DEDUPLICATED = REGISTRY.counter(
+    "pkg_embedding_deduplicated_total",
+    "Triples mapped onto an already embedded snippet instead of a new vector."
+)
+
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+def snippet_sentence(snippet: str, subject: str, obj: str) -> str:
+    sentences = SENTENCE_BOUNDARY.split(snippet.strip())
+    for sentence in sentences:
+        if subject in sentence and obj in sentence:
+            return sentence
+    for sentence in sentences:
+        if subject in sentence:
+            return sentence
+    return snippet.strip()
+
+
+def sentence_key(provenance: Dict, subject: str, obj: str) -> Tuple:
+    if provenance.get("sentence_start", -1) >= 0:
+        return provenance["source"], provenance["document"], provenance["sentence_start"], provenance["sentence_end"]
+    return provenance["source"], snippet_sentence(provenance["snippet"], subject, obj)
+
+
+def _row_keys(doc: Dict) -> List[Tuple]:
+    provenance = doc["provenance"]
+    keys = []
+    if "document" in provenance:
+        keys.append((provenance["source"], provenance["document"], provenance["start"], provenance["end"]))
+    if "text" in doc:
+        keys.append((provenance["source"], doc["text"]))
+    return keys
+
+
+def _span_provenance(provenance: Dict) -> Dict:
+    return {"source": provenance["source"], "document": provenance["document"],
+            "start": provenance["sentence_start"], "end": provenance["sentence_end"]}
+
+
+def _sentence_provenance(provenance: Dict, sentence: str) -> Dict:
+    if provenance.get("sentence_start", -1) >= 0:
+        return _span_provenance(provenance)
+    if provenance.get("document", -1) < 0:
+        return {"source": provenance["source"], "snippet": sentence}
+    start = provenance["snippet_start"] + max(provenance["snippet"].find(sentence), 0)
+    return {"source": provenance["source"], "document": provenance["document"],
+            "start": start, "end": start + len(sentence)}
+
+
+def _new_tfidf_vectorizer():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(max_features=300, stop_words='english')
+
+
+QUANTIZATION_MODES = ("none",) + tuple(QUANTIZERS)
+EMBEDDING_BACKENDS = ("openai", "tfidf", "local")
+
+
+class VectorSnapshot:
+    __slots__ = ("vectors", "norms", "metadata", "count", "vectorizer", "generation",
+                 "codes", "quantizer", "disk", "disk_count", "deleted", "deleted_count")
+    
+    def __init__(self, vectors: Optional[np.ndarray] = None, norms: Optional[np.ndarray] = None,
+                 metadata: Optional[List[Dict]] = None, count: int = 0, vectorizer=None, generation: int = 0,
+                 codes: Optional[np.ndarray] = None, quantizer=None, disk: Optional[np.ndarray] = None,
+                 disk_count: int = 0, deleted: Optional[np.ndarray] = None, deleted_count: int = 0):
+        self.vectors = vectors
+        self.norms = norms
+        self.metadata = metadata if metadata is not None else []
+        self.count = count
+        self.vectorizer = vectorizer
+        self.generation = generation
+        self.codes = codes
+        self.quantizer = quantizer
+        self.disk = disk
+        self.disk_count = disk_count
+        self.deleted = deleted
+        self.deleted_count = deleted_count
+    
+    def full_rows(self, indices: np.ndarray) -> np.ndarray:
+        if self.disk is None:
+            return self.vectors[indices]
+        rows = np.empty((len(indices), self.disk.shape[1]), dtype=self.disk.dtype)
+        on_disk = indices < self.disk_count
+        rows[on_disk] = self.disk[indices[on_disk]]
+        rows[~on_disk] = self.vectors[indices[~on_disk] - self.disk_count]
+        return rows
+
+
+class _RowBuffer:
+    __slots__ = ("data", "count")
+    
+    def __init__(self, rows: np.ndarray):
+        self.data = rows
+        self.count = len(rows)
+    
+    def extend(self, rows: np.ndarray):
+        needed = self.count + len(rows)
+        if needed > len(self.data):
+            data = np.empty_like(self.data, shape=(max(64, 2 * needed),) + self.data.shape[1:])
+            data[:self.count] = self.data[:self.count]
+            self.data = data
+        self.data[self.count:needed] = rows
+        self.count = needed
+    
+    def view(self) -> np.ndarray:
+        return self.data[:self.count]
 
 
 class EmbeddingStore:
-    def __init__(self, data_dir: str = "data", use_openai: Optional[bool] = None):
+    def __init__(self, data_dir: str = "data", use_openai: Optional[bool] = None,
+                 quantization: Optional[str] = None, rerank: Optional[int] = None,
+                 backend: Optional[str] = None, documents=None):
         self.data_dir = Path(data_dir)
+        self.documents = documents
         self.data_dir.mkdir(exist_ok=True)
         
         self.vectors_path = self.data_dir / "vectors.npy"
         self.metadata_path = self.data_dir / "vector_metadata.json"
         self.tfidf_path = self.data_dir / "tfidf_vectorizer.pkl"
+        self.index_path = self.data_dir / "vector_index.npz"
+        self.encoder_path = self.data_dir / "local_encoder.npz"
         
-        if use_openai is None:
-            use_openai = bool(os.getenv("OPENAI_API_KEY"))
+        self.quantization = quantization or os.getenv("PKG_VECTOR_QUANTIZATION", "none")
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown vector quantization '{self.quantization}'")
+        self.rerank = rerank if rerank is not None else int(os.getenv("PKG_VECTOR_RERANK", "4"))
         
-        self.use_openai = use_openai
+        if backend is None and use_openai is not None:
+            backend = "openai" if use_openai else "tfidf"
+        if backend is None:
+            backend = os.getenv("PKG_EMBEDDING_BACKEND") or ("openai" if os.getenv("OPENAI_API_KEY") else "tfidf")
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}'")
+        
+        self.backend = backend
+        self.use_openai = backend == "openai"
         self.openai_client = None
         
         if self.use_openai:
@@ -30,20 +167,52 @@ class EmbeddingStore:
             except Exception as e:
                 print(f"Failed to initialize OpenAI client: {e}")
                 self.use_openai = False
+                self.backend = "tfidf"
         
         self.tfidf_vectorizer = None
-        self.vectors = None
+        self.local_encoder = None
         self.metadata = []
+        self._snippet_rows = {}
+        self._legacy_rows = {}
+        
+        self._write_lock = threading.Lock()
+        self._generation = 0
+        self._vectors = None
+        self._norms = None
+        self._codes = None
+        self._quantizer = None
+        self._disk = None
+        self._disk_count = 0
+        self._deleted = None
+        self._deleted_count = 0
+        self._snapshot = VectorSnapshot()
         
-        self._load()
+        self.query_cache_size = 256
+        self._query_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        with timed("embeddings", "load"):
+            self._load()
+    
+    @property
+    def vectors(self) -> Optional[np.ndarray]:
+        return self._snapshot.vectors
+    
+    def snapshot(self) -> VectorSnapshot:
+        return self._snapshot
     
     def _load(self):
+        vectors = None
         if self.vectors_path.exists():
-            self.vectors = np.load(self.vectors_path)
+            vectors = np.load(self.vectors_path, mmap_mode=None if self.quantization == "none" else 'r')
         
         if self.metadata_path.exists():
             with open(self.metadata_path, 'r') as f:
-                self.metadata = json.load(f)
+                self._extend_metadata(json.load(f))
+        
+        if self.backend == "local":
+            self._load_local(vectors)
+            return
         
         if not self.use_openai and self.tfidf_path.exists():
             try:
@@ -51,23 +220,163 @@ class EmbeddingStore:
                     self.tfidf_vectorizer = pickle.load(f)
             except Exception as e:
                 print(f"Failed to load TF-IDF vectorizer: {e}")
-                if len(self.metadata) > 0:
-                    all_texts = [m["text"] for m in self.metadata]
-                    self.tfidf_vectorizer = TfidfVectorizer(max_features=300, stop_words='english')
-                    self.tfidf_vectorizer.fit(all_texts)
+        
+        if not self.use_openai and self.tfidf_vectorizer is None:
+            live = [m for m in self.metadata if m is not None]
+            if live:
+                with timed("embeddings", "rebuild_tfidf"):
+                    self._reset_metadata(live)
+                    self._publish_all(self._get_tfidf_embeddings([self._text(m) for m in live], refit=True))
+                return
+        
+        if vectors is not None:
+            vectors = vectors[:len(self.metadata)]
+            if self.quantization == "none":
+                self._publish_all(vectors)
+            else:
+                self._publish_disk(vectors)
+    
+    def _load_local(self, vectors: Optional[np.ndarray]):
+        if self.encoder_path.exists():
+            try:
+                with np.load(self.encoder_path) as data:
+                    self.local_encoder = LocalEncoder.from_arrays(data)
+            except Exception as e:
+                print(f"Failed to load local encoder: {e}")
+        
+        if self.local_encoder is not None and vectors is not None and vectors.shape[1] == self.local_encoder.dim:
+            vectors = vectors[:len(self.metadata)]
+            if self.quantization == "none":
+                self._publish_all(vectors)
+            else:
+                self._publish_disk(vectors)
+            return
+        
+        self.local_encoder = LocalEncoder()
+        live = [m for m in self.metadata if m is not None]
+        if live:
+            with timed("embeddings", "rebuild_local"):
+                self._reset_metadata(live)
+                texts = [self._text(m) for m in live]
+                self.local_encoder = self.local_encoder.partial_fit(texts)
+                if self.local_encoder.needs_refit():
+                    self.local_encoder = self.local_encoder.refit(texts)
+                self._publish_all(self.local_encoder.transform(texts))
+    
+    def _load_index(self, disk: np.ndarray):
+        if not self.index_path.exists():
+            return None
+        try:
+            with np.load(self.index_path) as data:
+                if str(data["kind"]) != self.quantization or len(data["codes"]) != len(disk):
+                    return None
+                quantizer = QUANTIZERS[self.quantization].from_arrays(data)
+                if quantizer.dim != disk.shape[1]:
+                    return None
+                return quantizer, data["codes"], data["norms"]
+        except Exception as e:
+            print(f"Failed to load vector index: {e}")
+            return None
     
     def save(self):
-        if self.vectors is not None:
-            np.save(self.vectors_path, self.vectors)
+        with self._write_lock, timed("embeddings", "save"):
+            snapshot = self._snapshot
+            if snapshot.count:
+                if snapshot.quantizer is None:
+                    _save_array(self.vectors_path, snapshot.vectors)
+                else:
+                    self._save_quantized(snapshot)
+            
+            with open(self.metadata_path, 'w') as f:
+                json.dump(snapshot.metadata[:snapshot.count], f, separators=(',', ':'))
+            
+            if self.backend == "local" and self.local_encoder is not None:
+                tmp_path = Path(f"{self.encoder_path}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, **self.local_encoder.to_arrays())
+                os.replace(tmp_path, self.encoder_path)
+            elif not self.use_openai and self.tfidf_vectorizer is not None:
+                with open(self.tfidf_path, 'wb') as f:
+                    pickle.dump(self.tfidf_vectorizer, f)
+    
+    def _save_quantized(self, snapshot: VectorSnapshot):
+        if snapshot.disk is None:
+            _save_array(self.vectors_path, snapshot.vectors)
+        elif snapshot.disk_count < snapshot.count:
+            tmp_path = Path(f"{self.vectors_path}.tmp")
+            merged = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=snapshot.disk.dtype,
+                                               shape=(snapshot.count, snapshot.disk.shape[1]))
+            for start in range(0, snapshot.disk_count, BLOCK_ROWS):
+                end = min(start + BLOCK_ROWS, snapshot.disk_count)
+                merged[start:end] = snapshot.disk[start:end]
+            merged[snapshot.disk_count:] = snapshot.vectors
+            merged.flush()
+            del merged
+            os.replace(tmp_path, self.vectors_path)
+        
+        tmp_path = Path(f"{self.index_path}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, kind=np.array(self.quantization), codes=snapshot.codes, norms=snapshot.norms,
+                     **snapshot.quantizer.to_arrays())
+        os.replace(tmp_path, self.index_path)
+        
+        disk = np.load(self.vectors_path, mmap_mode='r')
+        self._disk, self._disk_count = disk, len(disk)
+        self._vectors = _RowBuffer(np.empty((0, disk.shape[1]), dtype=disk.dtype))
+        self._snapshot = self._make_snapshot(snapshot.vectorizer, snapshot.generation)
+    
+    def _make_snapshot(self, vectorizer, generation: int) -> VectorSnapshot:
+        return VectorSnapshot(self._vectors.view(), self._norms.view(), self.metadata, self._norms.count,
+                              vectorizer, generation,
+                              codes=self._codes.view() if self._quantizer is not None else None,
+                              quantizer=self._quantizer, disk=self._disk, disk_count=self._disk_count,
+                              deleted=self._deleted, deleted_count=self._deleted_count)
+    
+    def _publish_all(self, vectors: np.ndarray):
+        self._generation += 1
+        self._vectors = _RowBuffer(vectors)
+        self._norms = _RowBuffer(_row_norms(vectors))
+        self._disk, self._disk_count = None, 0
+        self._deleted, self._deleted_count = _tombstone_mask(self.metadata[:len(vectors)])
+        if self.quantization != "none":
+            with timed("embeddings", "quantize"):
+                self._quantizer = QUANTIZERS[self.quantization]().fit(vectors)
+                self._codes = _RowBuffer(self._quantizer.encode(vectors))
+        self._snapshot = self._make_snapshot(self._vectorizer(), self._generation)
+    
+    def _vectorizer(self):
+        return self.local_encoder if self.backend == "local" else self.tfidf_vectorizer
+    
+    def _publish_disk(self, disk: np.ndarray):
+        index = self._load_index(disk)
+        if index is None:
+            with timed("embeddings", "quantize"):
+                quantizer = QUANTIZERS[self.quantization]().fit(disk)
+                index = quantizer, quantizer.encode(disk), _row_norms(disk)
         
-        with open(self.metadata_path, 'w') as f:
-            json.dump(self.metadata, f, indent=2)
+        self._generation += 1
+        self._quantizer = index[0]
+        self._codes = _RowBuffer(index[1])
+        self._norms = _RowBuffer(index[2])
+        self._disk, self._disk_count = disk, len(disk)
+        self._deleted, self._deleted_count = _tombstone_mask(self.metadata[:len(disk)])
+        self._vectors = _RowBuffer(np.empty((0, disk.shape[1]), dtype=disk.dtype))
+        self._snapshot = self._make_snapshot(self._vectorizer(), self._generation)
+    
+    def _publish_append(self, new_vectors: np.ndarray):
+        snapshot = self._snapshot
+        if snapshot.count == 0 or self._vectors.data.shape[1] != new_vectors.shape[1]:
+            self._publish_all(new_vectors)
+            return
         
-        if not self.use_openai and self.tfidf_vectorizer is not None:
-            with open(self.tfidf_path, 'wb') as f:
-                pickle.dump(self.tfidf_vectorizer, f)
+        self._vectors.extend(new_vectors)
+        self._norms.extend(_row_norms(new_vectors))
+        if self._quantizer is not None:
+            self._codes.extend(self._quantizer.encode(new_vectors))
+        self._snapshot = self._make_snapshot(self._vectorizer(), self._generation)
     
     def _get_openai_embedding(self, text: str) -> Optional[np.ndarray]:
+        EMBEDDING_REQUESTS.inc(backend="openai")
         try:
             response = self.openai_client.embeddings.create(
                 model="text-embedding-3-small",
@@ -80,76 +389,301 @@ class EmbeddingStore:
     
     def _get_tfidf_embeddings(self, texts: List[str], refit: bool = False) -> np.ndarray:
         if self.tfidf_vectorizer is None or refit:
-            all_texts = [m["text"] for m in self.metadata] + texts
-            self.tfidf_vectorizer = TfidfVectorizer(max_features=300, stop_words='english')
-            self.tfidf_vectorizer.fit(all_texts)
+            self.tfidf_vectorizer = _new_tfidf_vectorizer()
+            self.tfidf_vectorizer.fit(texts)
         
+        EMBEDDING_REQUESTS.inc(len(texts), backend="tfidf")
         return self.tfidf_vectorizer.transform(texts).toarray()
     
     def add_documents(self, documents: List[Dict]):
-        new_texts = [doc["text"] for doc in documents]
-        
-        if self.use_openai and self.openai_client:
-            new_vectors = []
-            for text in new_texts:
-                vec = self._get_openai_embedding(text)
-                if vec is not None:
-                    new_vectors.append(vec)
-                else:
-                    return False
-            new_vectors = np.array(new_vectors)
-        else:
-            if self.vectors is None:
-                new_vectors = self._get_tfidf_embeddings(new_texts)
+        with self._write_lock:
+            return self._add_documents(documents)
+    
+    def _add_documents(self, documents: List[Dict]) -> bool:
+        new_texts = [self._text(doc) for doc in documents]
+        
+        with timed("embeddings", "embed_documents"):
+            if self.use_openai and self.openai_client:
+                new_vectors = []
+                for text in new_texts:
+                    vec = self._get_openai_embedding(text)
+                    if vec is not None:
+                        new_vectors.append(vec)
+                    else:
+                        return False
+                self._append(documents, np.array(new_vectors))
+            elif self.backend == "local":
+                self._add_local(documents, new_texts)
             else:
-                old_texts = [m["text"] for m in self.metadata]
+                live = [m for m in self.metadata[:self._snapshot.count] if m is not None]
+                if len(live) < len(self.metadata):
+                    self._reset_metadata(live)
+                old_texts = [self._text(m) for m in live]
                 all_vectors = self._get_tfidf_embeddings(old_texts + new_texts, refit=True)
-                self.vectors = all_vectors
-                self.metadata.extend(documents)
-                return True
+                self._extend_metadata(documents)
+                self._publish_all(all_vectors)
         
-        if self.vectors is None:
-            self.vectors = new_vectors
-        else:
-            self.vectors = np.vstack([self.vectors, new_vectors])
+        return True
+    
+    def _add_local(self, documents: List[Dict], new_texts: List[str]):
+        encoder = self.local_encoder.partial_fit(new_texts)
+        EMBEDDING_REQUESTS.inc(len(new_texts), backend="local")
+        if not encoder.needs_refit():
+            vectors = encoder.transform(new_texts)
+            self.local_encoder = encoder
+            self._generation += 1
+            self._append(documents, vectors)
+            return
         
+        live = [m for m in self.metadata[:self._snapshot.count] if m is not None]
+        if len(live) < len(self.metadata):
+            self._reset_metadata(live)
+        texts = [self._text(m) for m in live] + new_texts
+        with timed("embeddings", "refit_local"):
+            self.local_encoder = encoder.refit(texts)
+            vectors = self.local_encoder.transform(texts)
+        self._extend_metadata(documents)
+        self._publish_all(vectors)
+    
+    def add_snippets(self, triples: List[Dict]) -> bool:
+        with self._write_lock:
+            new_documents = {}
+            for triple in triples:
+                provenance = triple["provenance"]
+                key = sentence_key(provenance, triple["subject"], triple["object"])
+                entry = {"subject": triple["subject"], "predicate": triple["predicate"], "object": triple["object"]}
+                
+                row = self._snippet_rows.get(key)
+                if row is not None:
+                    doc = self.metadata[row]
+                    if entry not in doc["triples"]:
+                        self.metadata[row] = dict(doc, triples=doc["triples"] + [entry])
+                    continue
+                
+                doc = new_documents.get(key)
+                if doc is None:
+                    doc = self._sentence_document(provenance, triple["subject"], triple["object"])
+                    new_documents[key] = doc
+                if entry not in doc["triples"]:
+                    doc["triples"].append(entry)
+            
+            EMBEDDING_DEDUPLICATED.inc(len(triples) - len(new_documents))
+            if not new_documents:
+                return True
+            return self._add_documents(list(new_documents.values()))
+    
+    def _sentence_document(self, provenance: Dict, subject: str, obj: str) -> Dict:
+        if provenance.get("sentence_start", -1) >= 0 and self.documents is not None:
+            return {"provenance": _span_provenance(provenance), "triples": []}
+        sentence = snippet_sentence(provenance["snippet"], subject, obj)
+        return {"text": sentence, "provenance": _sentence_provenance(provenance, sentence), "triples": []}
+    
+    def _text(self, doc: Dict) -> str:
+        if "text" in doc:
+            return doc["text"]
+        provenance = doc["provenance"]
+        return self.documents.text(provenance["document"], provenance["start"], provenance["end"])
+    
+    def _with_text(self, doc: Dict) -> Dict:
+        if "text" in doc or "document" not in doc.get("provenance", {}):
+            return doc
+        return dict(doc, text=self._text(doc))
+    
+    def add_vectors(self, documents: List[Dict], vectors: np.ndarray):
+        with self._write_lock:
+            self._append(documents, vectors)
+    
+    def _append(self, documents: List[Dict], vectors: np.ndarray):
+        self._extend_metadata(documents)
+        self._publish_append(vectors)
+    
+    def _extend_metadata(self, documents: List[Dict]):
+        for row, doc in enumerate(documents, start=len(self.metadata)):
+            if doc is None:
+                continue
+            if "triples" in doc:
+                for key in _row_keys(doc):
+                    self._snippet_rows[key] = row
+            elif "triple_key" in doc:
+                self._legacy_rows.setdefault((doc["provenance"]["source"], doc["triple_key"]), []).append(row)
         self.metadata.extend(documents)
-        return True
+    
+    def _reset_metadata(self, documents: List[Dict]):
+        self.metadata = []
+        self._snippet_rows = {}
+        self._legacy_rows = {}
+        self._extend_metadata(documents)
+    
+    def delete_triples(self, triples: List[Dict]) -> int:
+        with self._write_lock, timed("embeddings", "delete"):
+            snapshot = self._snapshot
+            tombstones = set()
+            for triple in triples:
+                source = triple["provenance"]["source"]
+                entry = {"subject": triple["subject"], "predicate": triple["predicate"], "object": triple["object"]}
+                
+                row = self._snippet_rows.get(sentence_key(triple["provenance"], triple["subject"], triple["object"]))
+                if row is not None and row < snapshot.count:
+                    doc = self.metadata[row]
+                    remaining = [t for t in doc["triples"] if t != entry]
+                    if remaining:
+                        self.metadata[row] = dict(doc, triples=remaining)
+                    else:
+                        tombstones.add(row)
+                
+                triple_key = f"{triple['subject']}:{triple['predicate']}:{triple['object']}"
+                tombstones.update(self._legacy_rows.pop((source, triple_key), []))
+            
+            if not tombstones:
+                return 0
+            
+            deleted = np.zeros(snapshot.count, dtype=bool)
+            if snapshot.deleted is not None:
+                deleted[:len(snapshot.deleted)] = snapshot.deleted
+            added = 0
+            for row in tombstones:
+                added += not deleted[row]
+                deleted[row] = True
+                doc = self.metadata[row]
+                if "triples" in doc:
+                    for key in _row_keys(doc):
+                        if self._snippet_rows.get(key) == row:
+                            del self._snippet_rows[key]
+            
+            self._deleted = deleted
+            self._deleted_count += added
+            self._snapshot = self._make_snapshot(snapshot.vectorizer, snapshot.generation)
+            for row in tombstones:
+                self.metadata[row] = None
+            return len(tombstones)
+    
+    def compact(self) -> int:
+        with self._write_lock, timed("embeddings", "compact"):
+            snapshot = self._snapshot
+            if not snapshot.deleted_count:
+                return 0
+            
+            live = np.flatnonzero(np.concatenate([~snapshot.deleted,
+                                                  np.ones(snapshot.count - len(snapshot.deleted), dtype=bool)]))
+            vectors = snapshot.full_rows(live)
+            self._reset_metadata([snapshot.metadata[row] for row in live])
+            self._publish_all(vectors)
+            return snapshot.count - len(live)
     
     def query(self, query_text: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
-        if self.vectors is None or len(self.metadata) == 0:
+        snapshot = self._snapshot
+        if snapshot.count == 0:
             return []
         
-        if self.use_openai and self.openai_client:
-            query_vec = self._get_openai_embedding(query_text)
-            if query_vec is None:
-                return []
-            query_vec = query_vec.reshape(1, -1)
-        else:
-            if self.tfidf_vectorizer is None:
-                if len(self.metadata) > 0:
-                    all_texts = [m["text"] for m in self.metadata]
-                    self.tfidf_vectorizer = TfidfVectorizer(max_features=300, stop_words='english')
-                    self.tfidf_vectorizer.fit(all_texts)
-                else:
-                    return []
-            query_vec = self.tfidf_vectorizer.transform([query_text]).toarray()
+        query_vec = self._embed_query(query_text, snapshot)
+        if query_vec is None:
+            return []
+        return self.search_vector(query_vec, top_k, snapshot)
+    
+    def search_vector(self, query_vec: np.ndarray, top_k: int = 5,
+                      snapshot: Optional[VectorSnapshot] = None) -> List[Tuple[Dict, float]]:
+        snapshot = snapshot or self._snapshot
+        if snapshot.count == 0:
+            return []
         
-        similarities = cosine_similarity(query_vec, self.vectors)[0]
+        with timed("embeddings", "score"):
+            query_vec = query_vec.ravel()
+            query_norm = np.linalg.norm(query_vec)
+            if query_norm == 0:
+                return []
+            
+            if snapshot.quantizer is None:
+                scores = snapshot.vectors @ query_vec
+            else:
+                scores = snapshot.quantizer.dot(snapshot.codes, query_vec)
+            similarities = _cosine(scores, snapshot.norms, query_norm)
+            if snapshot.deleted is not None:
+                similarities[:len(snapshot.deleted)][snapshot.deleted] = -np.inf
+            
+            k = min(top_k, snapshot.count)
+            rerank = snapshot.quantizer is not None and self.rerank > 0
+            candidates = min(snapshot.count, k * self.rerank) if rerank else k
+            top_indices = np.argpartition(-similarities, candidates - 1)[:candidates]
         
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        if rerank:
+            with timed("embeddings", "rerank"):
+                exact = snapshot.full_rows(top_indices) @ query_vec
+                top_scores = _cosine(exact, snapshot.norms[top_indices], query_norm)
+        else:
+            top_scores = similarities[top_indices]
+        order = np.argsort(-top_scores)[:k]
         
         results = []
-        for idx in top_indices:
-            if similarities[idx] > 0:
-                results.append((self.metadata[idx], float(similarities[idx])))
+        for idx, score in zip(top_indices[order], top_scores[order]):
+            doc = snapshot.metadata[idx]
+            if score > 0 and doc is not None:
+                results.append((self._with_text(doc), float(score)))
         
         return results
     
+    def _embed_query(self, query_text: str, snapshot: VectorSnapshot) -> Optional[np.ndarray]:
+        cache_key = (snapshot.generation, query_text)
+        with self._cache_lock:
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                self._query_cache.move_to_end(cache_key)
+        if cached is not None:
+            CACHE_REQUESTS.inc(cache="query_embedding", result="hit")
+            return cached
+        CACHE_REQUESTS.inc(cache="query_embedding", result="miss")
+        
+        with timed("embeddings", "embed_query"):
+            if self.use_openai and self.openai_client:
+                query_vec = self._get_openai_embedding(query_text)
+                if query_vec is None:
+                    return None
+                query_vec = query_vec.reshape(1, -1)
+            elif snapshot.vectorizer is None:
+                return None
+            elif self.backend == "local":
+                EMBEDDING_REQUESTS.inc(backend="local")
+                query_vec = snapshot.vectorizer.transform([query_text])
+            else:
+                EMBEDDING_REQUESTS.inc(backend="tfidf")
+                query_vec = snapshot.vectorizer.transform([query_text]).toarray()
+        
+        with self._cache_lock:
+            self._query_cache[cache_key] = query_vec
+            if len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return query_vec
+    
+    def get_vector_count(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.count - self._tombstones(snapshot)
+    
+    def get_tombstone_count(self) -> int:
+        return self._tombstones(self._snapshot)
+    
+    def _tombstones(self, snapshot: VectorSnapshot) -> int:
+        return snapshot.deleted_count
+    
+    def get_memory_bytes(self) -> int:
+        snapshot = self._snapshot
+        arrays = (snapshot.vectors, snapshot.norms, snapshot.codes)
+        return sum(array.nbytes for array in arrays if array is not None)
+    
     def clear(self):
-        self.vectors = None
-        self.metadata = []
-        self.tfidf_vectorizer = None
+        with self._write_lock:
+            self._reset_metadata([])
+            self.tfidf_vectorizer = None
+            if self.backend == "local":
+                self.local_encoder = LocalEncoder()
+            self._vectors = None
+            self._norms = None
+            self._codes = None
+            self._quantizer = None
+            self._disk, self._disk_count = None, 0
+            self._deleted, self._deleted_count = None, 0
+            self._generation += 1
+            self._snapshot = VectorSnapshot(generation=self._generation)
+        with self._cache_lock:
+            self._query_cache.clear()
         
         if self.vectors_path.exists():
             self.vectors_path.unlink()
@@ -157,3 +691,32 @@ class EmbeddingStore:
             self.metadata_path.unlink()
         if self.tfidf_path.exists():
             self.tfidf_path.unlink()
+        if self.index_path.exists():
+            self.index_path.unlink()
+        if self.encoder_path.exists():
+            self.encoder_path.unlink()
+
+
+def _row_norms(vectors: np.ndarray) -> np.ndarray:
+    norms = np.empty(len(vectors))
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        norms[start:start + BLOCK_ROWS] = np.linalg.norm(vectors[start:start + BLOCK_ROWS], axis=1)
+    return norms
+
+
+def _cosine(scores: np.ndarray, norms: np.ndarray, query_norm: float) -> np.ndarray:
+    denominators = norms * query_norm
+    return np.divide(scores, denominators, out=np.zeros(len(scores)), where=denominators > 0)
+
+
+def _tombstone_mask(metadata: List[Optional[Dict]]) -> Tuple[Optional[np.ndarray], int]:
+    deleted = np.fromiter((doc is None for doc in metadata), dtype=bool, count=len(metadata))
+    count = int(deleted.sum())
+    return (deleted, count) if count else (None, 0)
+
+
+def _save_array(path: Path, values: np.ndarray):
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, 'wb') as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
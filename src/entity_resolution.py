@@ -0,0 +1,126 @@
+import re
+import zlib
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.metrics import REGISTRY
+
+
+HONORIFICS = frozenset({
+    "dr", "mr", "mrs", "ms", "miss", "prof", "professor", "sir", "madam",
+    "jr", "sr", "phd", "md"
+})
+NON_WORD = re.compile(r"[^\w\s]+")
+DEFAULT_MATCH_THRESHOLD = 0.8
+TOKEN_MATCH_RATIO = 0.75
+
+ENTITY_RESOLUTIONS = REGISTRY.counter(
+    "pkg_entity_resolutions_total",
+    "Entities merged into an existing canonical id by the entity resolver.",
+    ("mode",)
+)
+
+
+def tokens_aligned(key: str, other: str) -> bool:
+    tokens, other_tokens = key.split(), other.split()
+    if len(tokens) != len(other_tokens):
+        return False
+    return all(token == other_token or SequenceMatcher(None, token, other_token).ratio() >= TOKEN_MATCH_RATIO
+               for token, other_token in zip(tokens, other_tokens))
+
+
+class EntityResolver:
+    def __init__(self, threshold: float = DEFAULT_MATCH_THRESHOLD, num_perm: int = 32, bands: int = 8,
+                 ngram: int = 3, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        
+        self._keys: Dict[str, str] = {}
+        self._entity_keys: Dict[str, List[str]] = {}
+        self._shingles: Dict[str, List[Tuple[str, Set[int]]]] = {}
+        self._entries: Dict[str, List[Tuple]] = {}
+        self._buckets: Dict[Tuple, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def key(self, text: str) -> str:
+        tokens = NON_WORD.sub(" ", text.lower()).split()
+        kept = [token for token in tokens if token not in HONORIFICS]
+        return " ".join(kept or tokens)
+    
+    def shingles(self, key: str) -> Set[int]:
+        padded = f" {key} "
+        if len(padded) <= self.ngram:
+            return {zlib.crc32(padded.encode())}
+        return {zlib.crc32(padded[i:i + self.ngram].encode()) for i in range(len(padded) - self.ngram + 1)}
+    
+    def signature(self, shingles: Iterable[int]) -> np.ndarray:
+        hashes = np.fromiter(shingles, dtype=np.uint64)
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)).min(axis=1)
+    
+    def _band_keys(self, shingles: Set[int]) -> List[Tuple]:
+        signature = self.signature(shingles)
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+    
+    def add(self, entity_id: str, text: str):
+        key = self.key(text)
+        if not key:
+            return
+        if key not in self._keys:
+            self._keys[key] = entity_id
+            self._entity_keys.setdefault(entity_id, []).append(key)
+        
+        shingles = self.shingles(key)
+        self._shingles.setdefault(entity_id, []).append((key, shingles))
+        entries = self._entries.setdefault(entity_id, [])
+        for band_key in self._band_keys(shingles):
+            bucket = self._buckets.setdefault(band_key, set())
+            if entity_id not in bucket:
+                bucket.add(entity_id)
+                entries.append(band_key)
+    
+    def remove(self, entity_id: str):
+        for band_key in self._entries.pop(entity_id, []):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(entity_id)
+                if not bucket:
+                    del self._buckets[band_key]
+        self._shingles.pop(entity_id, None)
+        for key in self._entity_keys.pop(entity_id, []):
+            del self._keys[key]
+    
+    def candidates(self, shingles: Set[int]) -> Set[str]:
+        found = set()
+        for band_key in self._band_keys(shingles):
+            found.update(self._buckets.get(band_key, ()))
+        return found
+    
+    def find(self, text: str) -> Optional[Tuple[str, float]]:
+        key = self.key(text)
+        if not key:
+            return None
+        if key in self._keys:
+            return self._keys[key], 1.0
+        
+        shingles = self.shingles(key)
+        best = None
+        for entity_id in self.candidates(shingles):
+            for other_key, other in self._shingles[entity_id]:
+                score = len(shingles & other) / len(shingles | other)
+                if score >= self.threshold and (best is None or score > best[1]) and tokens_aligned(key, other_key):
+                    best = (entity_id, score)
+        return best
@@ -0,0 +1,143 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from src.metrics import timed
+
+
+class CentralityScores:
+    def __init__(self, degree: np.ndarray, pagerank: np.ndarray, component: np.ndarray,
+                 iterations: int = 0, edges: int = 0, computed_at: Optional[float] = None):
+        self.degree = degree
+        self.pagerank = pagerank
+        self.component = component
+        self.component_sizes = np.bincount(component) if len(component) else np.zeros(0, dtype=np.int64)
+        self.iterations = iterations
+        self.edges = edges
+        self.computed_at = computed_at or time.time()
+        self.max_pagerank = float(pagerank.max()) if len(pagerank) else 0.0
+    
+    def __len__(self) -> int:
+        return len(self.pagerank)
+    
+    def score(self, entity: Optional[int]) -> float:
+        if entity is None or entity >= len(self.pagerank) or self.max_pagerank <= 0:
+            return 0.0
+        return float(self.pagerank[entity]) / self.max_pagerank
+    
+    def entity_stats(self, entity: int) -> Optional[Dict]:
+        if entity >= len(self.pagerank):
+            return None
+        component = int(self.component[entity])
+        return {
+            "degree": int(self.degree[entity]),
+            "pagerank": round(float(self.pagerank[entity]), 8),
+            "score": round(self.score(entity), 4),
+            "component": component,
+            "component_size": int(self.component_sizes[component])
+        }
+    
+    def summary(self) -> Dict:
+        live = self.degree > 0
+        components = np.unique(self.component[live]) if live.any() else np.zeros(0)
+        return {
+            "entities": int(live.sum()),
+            "edges": self.edges,
+            "components": len(components),
+            "largest_component": int(self.component_sizes[components].max()) if len(components) else 0,
+            "pagerank_iterations": self.iterations,
+            "computed_at": self.computed_at
+        }
+    
+    def save(self, path: Path, entity_ids):
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, ids=np.array(entity_ids, dtype=str), degree=self.degree, pagerank=self.pagerank,
+                     component=self.component, meta=np.array([self.iterations, self.edges, self.computed_at]))
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path: Path, entity_index) -> Optional["CentralityScores"]:
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                ids, meta = data["ids"], data["meta"]
+                degree, pagerank, component = data["degree"], data["pagerank"], data["component"]
+        except Exception as e:
+            print(f"Failed to load centrality scores: {e}")
+            return None
+        
+        positions = np.array([entity_index(str(entity_id)) for entity_id in ids], dtype=np.int64)
+        known = positions >= 0
+        size = int(positions.max()) + 1 if known.any() else 0
+        aligned_degree = np.zeros(size, dtype=degree.dtype)
+        aligned_pagerank = np.zeros(size, dtype=pagerank.dtype)
+        aligned_component = np.zeros(size, dtype=component.dtype)
+        aligned_degree[positions[known]] = degree[known]
+        aligned_pagerank[positions[known]] = pagerank[known]
+        aligned_component[positions[known]] = component[known]
+        return cls(aligned_degree, aligned_pagerank, aligned_component,
+                   iterations=int(meta[0]), edges=int(meta[1]), computed_at=float(meta[2]))
+
+
+def adjacency(subjects: np.ndarray, objects: np.ndarray, size: int) -> sparse.csr_matrix:
+    keep = subjects != objects
+    weights = np.ones(int(keep.sum()), dtype=np.float64)
+    matrix = sparse.csr_matrix((weights, (subjects[keep], objects[keep])), shape=(size, size))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def pagerank(matrix: sparse.csr_matrix, damping: float = 0.85, tolerance: float = 1e-8,
+             max_iterations: int = 100, start: Optional[np.ndarray] = None,
+             active: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+    size = matrix.shape[0]
+    if active is None:
+        active = np.ones(size, dtype=bool)
+    count = int(active.sum())
+    if count == 0:
+        return np.zeros(size), 0
+    
+    teleport = active / count
+    out_weight = np.asarray(matrix.sum(axis=1)).ravel()
+    dangling = active & (out_weight == 0)
+    inverse = np.divide(1.0, out_weight, out=np.zeros(size), where=out_weight > 0)
+    transition = sparse.csr_matrix(matrix.multiply(inverse[:, None])).T.tocsr()
+    
+    ranks = teleport.copy()
+    if start is not None:
+        known = min(len(start), size)
+        ranks[:known] = np.where(active[:known], start[:known], teleport[:known])
+        total = ranks.sum()
+        ranks = ranks / total if total > 0 else teleport.copy()
+    
+    for iteration in range(1, max_iterations + 1):
+        previous = ranks
+        ranks = damping * (transition @ previous + previous[dangling].sum() * teleport) + (1 - damping) * teleport
+        if np.abs(ranks - previous).sum() < tolerance:
+            return ranks, iteration
+    return ranks, max_iterations
+
+
+def compute_centrality(subjects: np.ndarray, objects: np.ndarray, size: int,
+                       previous: Optional[CentralityScores] = None) -> CentralityScores:
+    with timed("analytics", "adjacency"):
+        matrix = adjacency(subjects, objects, size)
+        degree = (np.bincount(subjects, minlength=size) + np.bincount(objects, minlength=size)).astype(np.int64)
+        active = degree > 0
+    
+    with timed("analytics", "pagerank"):
+        start = previous.pagerank if previous is not None and len(previous) else None
+        ranks, iterations = pagerank(matrix, start=start, active=active)
+    
+    with timed("analytics", "components"):
+        _, component = connected_components(matrix, directed=True, connection="weak")
+    
+    return CentralityScores(degree, ranks, component.astype(np.int64), iterations=iterations,
+                            edges=int(matrix.nnz))
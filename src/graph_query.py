@@ -0,0 +1,234 @@
+import re
+from typing import Dict, Iterator, List, Optional, Sequence, TYPE_CHECKING
+
+from src.metrics import REGISTRY, timed
+from src.rdf import PKG_NAMESPACE
+
+if TYPE_CHECKING:
+    from src.graph_store import GraphStore
+
+
+TOKEN = re.compile(r'\?\w+|<[^>]*>|"(?:[^"\\]|\\.)*"|[^\s.<>"]+(?:\.[^\s.<>"]+)*|\.')
+
+MATCH_JOINS = REGISTRY.counter(
+    "pkg_graph_match_joins_total",
+    "Join steps executed by the graph pattern matcher.",
+    ("method",)
+)
+
+
+class Term:
+    __slots__ = ("text", "variable", "value")
+    
+    def __init__(self, text: str, variable: Optional[str] = None, value: Optional[int] = None):
+        self.text = text
+        self.variable = variable
+        self.value = value
+
+
+class TriplePattern:
+    def __init__(self, subject: Term, predicate: Term, obj: Term):
+        self.terms = (subject, predicate, obj)
+    
+    @property
+    def variables(self) -> List[str]:
+        return [term.variable for term in self.terms if term.variable]
+    
+    def bound(self, binding: Dict[str, int]) -> List[Optional[int]]:
+        return [binding.get(term.variable) if term.variable else term.value for term in self.terms]
+    
+    def to_text(self) -> str:
+        return " ".join(term.text for term in self.terms)
+
+
+class JoinStep:
+    __slots__ = ("pattern", "method", "shared", "estimate", "rows")
+    
+    def __init__(self, pattern: TriplePattern, method: str, shared: List[str], estimate: int, rows: float):
+        self.pattern = pattern
+        self.method = method
+        self.shared = shared
+        self.estimate = estimate
+        self.rows = rows
+    
+    def to_dict(self) -> Dict:
+        return {
+            "pattern": self.pattern.to_text(),
+            "method": self.method,
+            "join_on": self.shared,
+            "pattern_rows": self.estimate,
+            "estimated_rows": round(self.rows, 2)
+        }
+
+
+def parse_where(text: str) -> List[List[str]]:
+    patterns, current = [], []
+    for token in TOKEN.findall(text):
+        if token == ".":
+            if current:
+                raise ValueError("Each pattern needs a subject, predicate and object")
+            continue
+        current.append(token)
+        if len(current) == 3:
+            patterns.append(current)
+            current = []
+    if current:
+        raise ValueError("Each pattern needs a subject, predicate and object")
+    return patterns
+
+
+def _local_name(token: str) -> Optional[str]:
+    if token.startswith("<") and token.endswith(">"):
+        uri = token[1:-1]
+        return uri[len(PKG_NAMESPACE):] if uri.startswith(PKG_NAMESPACE) else uri
+    if token.startswith("pkg:"):
+        return token[4:]
+    return None
+
+
+class PatternQuery:
+    def __init__(self, graph_store: "GraphStore", patterns: Sequence[Sequence[str]]):
+        if not patterns:
+            raise ValueError("At least one pattern is required")
+        self.graph_store = graph_store
+        self.patterns = [self._parse(pattern) for pattern in patterns]
+        self.variables = []
+        for pattern in self.patterns:
+            for variable in pattern.variables:
+                if variable not in self.variables:
+                    self.variables.append(variable)
+        self._check_variables()
+        self.empty = any(term.value is None and not term.variable
+                         for pattern in self.patterns for term in pattern.terms)
+    
+    def _parse(self, pattern: Sequence[str]) -> TriplePattern:
+        if len(pattern) != 3:
+            raise ValueError("Each pattern needs a subject, predicate and object")
+        return TriplePattern(*(self._term(str(token).strip(), position == 1)
+                               for position, token in enumerate(pattern)))
+    
+    def _term(self, token: str, predicate: bool) -> Term:
+        if token.startswith("?"):
+            if not re.fullmatch(r"\?\w+", token):
+                raise ValueError(f"Invalid variable '{token}'")
+            return Term(token, variable=token[1:])
+        
+        name = _local_name(token)
+        if token.startswith('"'):
+            token_text = token[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        else:
+            token_text = token
+        
+        if predicate:
+            return Term(token, value=self.graph_store.term_id(name or token_text, predicate=True))
+        if name is not None:
+            return Term(token, value=self.graph_store.term_id(name))
+        return Term(token, value=self.graph_store.term_id(self.graph_store.get_canonical_id(token_text)))
+    
+    def _check_variables(self):
+        positions = {}
+        for pattern in self.patterns:
+            for index, term in enumerate(pattern.terms):
+                if term.variable:
+                    kind = "predicate" if index == 1 else "entity"
+                    if positions.setdefault(term.variable, kind) != kind:
+                        raise ValueError(f"Variable ?{term.variable} is used both as a predicate and an entity")
+        self.kinds = positions
+    
+    def plan(self, limit: Optional[int] = None) -> List[JoinStep]:
+        with timed("graph", "plan_match"):
+            return self._plan(limit)
+    
+    def _plan(self, limit: Optional[int]) -> List[JoinStep]:
+        graph_store = self.graph_store
+        remaining = list(self.patterns)
+        estimates = {id(pattern): graph_store.cardinality(*pattern.bound({})) for pattern in remaining}
+        
+        first = min(remaining, key=lambda pattern: estimates[id(pattern)])
+        remaining.remove(first)
+        steps = [JoinStep(first, "scan", [], estimates[id(first)], estimates[id(first)])]
+        bound = set(first.variables)
+        rows = float(estimates[id(first)])
+        
+        while remaining:
+            candidates = []
+            for pattern in remaining:
+                shared = [variable for variable in dict.fromkeys(pattern.variables) if variable in bound]
+                estimate = estimates[id(pattern)]
+                if shared:
+                    probe_rows = min(estimate, graph_store.fanout(pattern.terms[1].value))
+                    output = rows * probe_rows
+                    needed = min(1.0, limit / max(output, 1.0)) if limit else 1.0
+                    index_cost = needed * rows * max(1.0, min(estimate, graph_store.fanout(None)))
+                    hash_cost = estimate + needed * rows
+                    method = "index" if index_cost <= hash_cost else "hash"
+                    cost = min(index_cost, hash_cost)
+                else:
+                    method, cost, output = "cross", rows * estimate, rows * estimate
+                candidates.append((not shared, cost, pattern, method, shared, output))
+            
+            _, _, pattern, method, shared, output = min(candidates, key=lambda item: (item[0], item[1]))
+            remaining.remove(pattern)
+            rows = output
+            steps.append(JoinStep(pattern, method, shared, estimates[id(pattern)], rows))
+            bound.update(pattern.variables)
+        return steps
+    
+    def _extend(self, pattern: TriplePattern, binding: Dict[str, int], row: int) -> Optional[Dict[str, int]]:
+        extended = dict(binding)
+        for term, value in zip(pattern.terms, self.graph_store.row_terms(row)):
+            if term.variable:
+                if extended.setdefault(term.variable, value) != value:
+                    return None
+        return extended
+    
+    def _index_join(self, step: JoinStep, bindings: Iterator[Dict[str, int]], view) -> Iterator[Dict[str, int]]:
+        MATCH_JOINS.inc(method=step.method)
+        for binding in bindings:
+            for row in self.graph_store.scan(*step.pattern.bound(binding), view=view):
+                extended = self._extend(step.pattern, binding, row)
+                if extended is not None:
+                    yield extended
+    
+    def _hash_join(self, step: JoinStep, bindings: Iterator[Dict[str, int]], view) -> Iterator[Dict[str, int]]:
+        MATCH_JOINS.inc(method=step.method)
+        table = None
+        for binding in bindings:
+            if table is None:
+                table = {}
+                for row in self.graph_store.scan(*step.pattern.bound({}), view=view):
+                    matched = self._extend(step.pattern, {}, row)
+                    if matched is not None:
+                        key = tuple(matched[variable] for variable in step.shared)
+                        table.setdefault(key, []).append(matched)
+            
+            for matched in table.get(tuple(binding[variable] for variable in step.shared), ()):
+                yield {**binding, **matched}
+    
+    def execute(self, limit: Optional[int] = None, steps: Optional[List[JoinStep]] = None) -> Iterator[Dict[str, int]]:
+        if self.empty:
+            return
+        steps = steps or self.plan(limit)
+        view = self.graph_store.view()
+        
+        bindings = iter([{}])
+        for step in steps:
+            if step.method == "hash":
+                bindings = self._hash_join(step, bindings, view)
+            else:
+                bindings = self._index_join(step, bindings, view)
+        
+        emitted = 0
+        for binding in bindings:
+            yield binding
+            emitted += 1
+            if limit is not None and emitted >= limit:
+                return
+    
+    def render(self, binding: Dict[str, int]) -> Dict:
+        graph_store = self.graph_store
+        return {
+            variable: (graph_store.predicate_term(binding[variable]) if self.kinds[variable] == "predicate"
+                       else graph_store.entity_term(binding[variable]))
+            for variable in self.variables
+        }
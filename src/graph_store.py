@@ -1,66 +1,284 @@
 import json
 import os
+import threading
+from array import array
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-from rdflib import Graph, URIRef, Literal, Namespace
-from rdflib.namespace import RDF, RDFS
+from typing import List, Dict, Optional, Iterable, Iterator, Set, Tuple
 import hashlib
+import numpy as np
+
+from src.doc_store import DocumentStore
+from src.entity_resolution import DEFAULT_MATCH_THRESHOLD, ENTITY_RESOLUTIONS, EntityResolver
+from src.metrics import timed
+from src.rdf import PKG_NAMESPACE
+from src.snapshot import SnapshotReader, StringColumn, write_snapshot
+
+
+NEVER_DELETED = 1 << 62
+
+_dictionary_lock = threading.Lock()
 
 
 class ProvenanceInfo:
-    def __init__(self, source: str, snippet: str, start: int, end: int):
+    __slots__ = ("source", "snippet", "start", "end", "document", "snippet_start", "snippet_end",
+                 "sentence_start", "sentence_end")
+    
+    def __init__(self, source: str, snippet: str, start: int, end: int, document: int = -1,
+                 snippet_start: int = -1, snippet_end: int = -1, sentence_start: int = -1,
+                 sentence_end: int = -1):
         self.source = source
         self.snippet = snippet
         self.start = start
         self.end = end
+        self.document = document
+        self.snippet_start = snippet_start
+        self.snippet_end = snippet_end
+        self.sentence_start = sentence_start
+        self.sentence_end = sentence_end
     
     def to_dict(self):
-        return {
+        info = {
             "source": self.source,
             "snippet": self.snippet,
             "start": self.start,
             "end": self.end
         }
+        if self.document >= 0:
+            info.update(document=self.document, snippet_start=self.snippet_start, snippet_end=self.snippet_end)
+            if self.sentence_start >= 0:
+                info.update(sentence_start=self.sentence_start, sentence_end=self.sentence_end)
+        return info
+
+
+class TermDictionary:
+    __slots__ = ("_ids", "terms")
+    
+    def __init__(self, terms=None):
+        self.terms = terms if terms is not None else []
+        self._ids: Optional[Dict[str, int]] = None if terms is not None else {}
+    
+    @property
+    def ids(self) -> Dict[str, int]:
+        if self._ids is None:
+            with _dictionary_lock:
+                if self._ids is None:
+                    self._ids = {term: term_id for term_id, term in enumerate(self.terms)}
+        return self._ids
+    
+    def intern(self, term: str) -> int:
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+    
+    def get(self, term: str) -> Optional[int]:
+        return self.ids.get(term)
+    
+    def term(self, term_id: int) -> str:
+        return self.terms[term_id]
+    
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
+def triple_id(s: int, p: int, o: int) -> int:
+    return (s << 48) | (p << 32) | o
 
 
 class GraphStore:
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", match_threshold: Optional[float] = None):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         
+        self.snapshot_path = self.data_dir / "graph.snap"
         self.graph_path = self.data_dir / "graph.ttl"
         self.provenance_path = self.data_dir / "provenance.json"
         self.aliases_path = self.data_dir / "aliases.json"
         
-        self.graph = Graph()
-        self.PKG = Namespace("http://pkg.local/")
-        self.graph.bind("pkg", self.PKG)
+        self.entities = TermDictionary()
+        self.entity_labels = []
+        self.predicates = TermDictionary()
+        self.sources = TermDictionary()
+        self.surfaces = TermDictionary()
+        
+        self._s = array('q')
+        self._p = array('q')
+        self._o = array('q')
+        self._subject_surface = array('q')
+        self._object_surface = array('q')
+        self._confidence = array('d')
+        self._source = array('q')
+        self._start = array('q')
+        self._end = array('q')
+        self._snippet = []
+        self._document = array('q')
+        self._snippet_start = array('q')
+        self._snippet_end = array('q')
+        self._sentence_start = array('q')
+        self._sentence_end = array('q')
+        self._deleted_at = array('q')
+        self._live_rows = 0
+        
+        self._write_lock = threading.RLock()
+        self._batch_depth = 0
+        self._deferred = False
+        self._version = 0
+        self._published = (0, 0)
+        
+        self._indexed_rows = 0
+        self._rows: Dict[int, int] = {}
+        self._out: Dict[int, List[int]] = {}
+        self._in: Dict[int, List[int]] = {}
+        self._by_predicate: Dict[int, List[int]] = {}
         
-        self.provenance_store = {}
         self.alias_table = {}
+        self._aliases_by_entity: Dict[str, List[str]] = {}
+        self._surface_cache: Dict[str, int] = {}
         
-        self._load()
+        if match_threshold is None:
+            match_threshold = float(os.getenv("PKG_ENTITY_MATCH_THRESHOLD", "0"))
+        self.match_threshold = match_threshold
+        self._resolver: Optional[EntityResolver] = None
+        
+        self._entity_refs: Dict[int, int] = {}
+        self.centrality = None
+        self._predicate_counts: Dict[int, int] = {}
+        self._source_counts: Dict[int, int] = {}
+        
+        with timed("graph", "load"):
+            self.documents = DocumentStore(data_dir)
+            self._load()
+            self._ensure_indexes()
+            self._publish()
     
     def _load(self):
-        if self.graph_path.exists():
-            self.graph.parse(self.graph_path, format="turtle")
-        
-        if self.provenance_path.exists():
-            with open(self.provenance_path, 'r') as f:
-                self.provenance_store = json.load(f)
+        if self.snapshot_path.exists():
+            self._load_snapshot()
+            return
         
         if self.aliases_path.exists():
             with open(self.aliases_path, 'r') as f:
-                self.alias_table = json.load(f)
+                for alias, canonical_id in json.load(f).items():
+                    self._set_alias(alias, canonical_id)
+        
+        if self.provenance_path.exists():
+            with open(self.provenance_path, 'r') as f:
+                provenance_store = json.load(f)
+            
+            for triple_key, prov_data in provenance_store.items():
+                subject_id, predicate, object_id = triple_key.split(":", 2)
+                prov = prov_data["provenance"]
+                self._insert(
+                    self._intern_entity(subject_id, prov_data["subject"]),
+                    self.predicates.intern(predicate),
+                    self._intern_entity(object_id, prov_data["object"]),
+                    prov_data["subject"], prov_data["object"], prov_data["confidence"],
+                    ProvenanceInfo(prov["source"], prov["snippet"], prov["start"], prov["end"])
+                )
+        elif self.graph_path.exists():
+            self.import_turtle(self.graph_path)
     
-    def save(self):
-        self.graph.serialize(destination=str(self.graph_path), format="turtle")
+    def _load_snapshot(self):
+        reader = SnapshotReader(self.snapshot_path)
+        
+        self.entities = TermDictionary(StringColumn(reader.strings("entities")))
+        self.entity_labels = StringColumn(reader.strings("entity_labels"))
+        self.predicates = TermDictionary(StringColumn(reader.strings("predicates")))
+        self.sources = TermDictionary(StringColumn(reader.strings("sources")))
+        self.surfaces = TermDictionary(StringColumn(reader.strings("surfaces")))
         
-        with open(self.provenance_path, 'w') as f:
-            json.dump(self.provenance_store, f, indent=2)
+        self._s = reader.array("s")
+        self._p = reader.array("p")
+        self._o = reader.array("o")
+        self._subject_surface = reader.array("subject_surface")
+        self._object_surface = reader.array("object_surface")
+        self._confidence = reader.array("confidence")
+        self._source = reader.array("source")
+        self._start = reader.array("start")
+        self._end = reader.array("end")
+        self._snippet = StringColumn(reader.strings("snippets"))
+        if "document" in reader:
+            self._document = reader.array("document")
+            self._snippet_start = reader.array("snippet_start")
+            self._snippet_end = reader.array("snippet_end")
+        else:
+            self._document = array('q', [-1]) * len(self._s)
+            self._snippet_start = array('q', [-1]) * len(self._s)
+            self._snippet_end = array('q', [-1]) * len(self._s)
+        if "sentence_start" in reader:
+            self._sentence_start = reader.array("sentence_start")
+            self._sentence_end = reader.array("sentence_end")
+        else:
+            self._sentence_start = array('q', [-1]) * len(self._s)
+            self._sentence_end = array('q', [-1]) * len(self._s)
+        self._deleted_at = array('q', [NEVER_DELETED]) * len(self._s)
+        self._live_rows = len(self._s)
         
-        with open(self.aliases_path, 'w') as f:
-            json.dump(self.alias_table, f, indent=2)
+        for alias, canonical_id in zip(reader.strings("alias_keys"), reader.strings("alias_values")):
+            self._set_alias(alias, canonical_id)
+        
+        self._entity_refs = _counts_from_array(reader.array("entity_refs"))
+        self._predicate_counts = _counts_from_array(reader.array("predicate_counts"))
+        self._source_counts = _counts_from_array(reader.array("source_counts"))
+    
+    def save(self):
+        with self._write_lock, timed("graph", "save"):
+            self.documents.save()
+            columns = {
+                "s": self._s,
+                "p": self._p,
+                "o": self._o,
+                "subject_surface": self._subject_surface,
+                "object_surface": self._object_surface,
+                "confidence": self._confidence,
+                "source": self._source,
+                "start": self._start,
+                "end": self._end,
+                "document": self._document,
+                "snippet_start": self._snippet_start,
+                "snippet_end": self._snippet_end,
+                "sentence_start": self._sentence_start,
+                "sentence_end": self._sentence_end
+            }
+            snippets = self._snippet
+            if self._live_rows < len(self._s):
+                live = [row for row, deleted_at in enumerate(self._deleted_at) if deleted_at == NEVER_DELETED]
+                columns = {name: array(column.typecode, [column[row] for row in live])
+                           for name, column in columns.items()}
+                snippets = (self._snippet[row] for row in live)
+            
+            write_snapshot(self.snapshot_path, arrays=dict(columns, **{
+                "entity_refs": _counts_to_array(self._entity_refs, len(self.entities)),
+                "predicate_counts": _counts_to_array(self._predicate_counts, len(self.predicates)),
+                "source_counts": _counts_to_array(self._source_counts, len(self.sources))
+            }), strings={
+                "entities": self.entities.terms,
+                "entity_labels": self.entity_labels,
+                "predicates": self.predicates.terms,
+                "sources": self.sources.terms,
+                "surfaces": self.surfaces.terms,
+                "snippets": snippets,
+                "alias_keys": list(self.alias_table.keys()),
+                "alias_values": list(self.alias_table.values())
+            })
+    
+    def _ensure_indexes(self):
+        if self._indexed_rows == len(self._s):
+            return
+        with timed("graph", "build_indexes"):
+            rows, out_index, in_index, by_predicate = self._rows, self._out, self._in, self._by_predicate
+            start = self._indexed_rows
+            columns = zip(self._s[start:], self._p[start:], self._o[start:], self._deleted_at[start:])
+            for row, (s, p, o, deleted_at) in enumerate(columns, start):
+                if deleted_at == NEVER_DELETED:
+                    rows[triple_id(s, p, o)] = row
+                out_index.setdefault(s, []).append(row)
+                in_index.setdefault(o, []).append(row)
+                by_predicate.setdefault(p, []).append(row)
+            self._indexed_rows = len(self._s)
     
     def _normalize_entity(self, text: str) -> str:
         return text.lower().strip()
@@ -71,104 +289,574 @@ class GraphStore:
             return self.alias_table[normalized]
         return hashlib.md5(normalized.encode()).hexdigest()[:16]
     
+    def _set_alias(self, alias: str, canonical_id: str):
+        previous = self.alias_table.get(alias)
+        if previous is not None and alias in self._aliases_by_entity.get(previous, []):
+            self._aliases_by_entity[previous].remove(alias)
+        self.alias_table[alias] = canonical_id
+        self._aliases_by_entity.setdefault(canonical_id, []).append(alias)
+    
     def add_alias(self, text: str, canonical_id: str):
         normalized = self._normalize_entity(text)
-        self.alias_table[normalized] = canonical_id
+        with self._write_lock:
+            self._set_alias(normalized, canonical_id)
+            self._surface_cache.pop(normalized, None)
     
     def get_canonical_id(self, text: str) -> str:
         normalized = self._normalize_entity(text)
         return self.alias_table.get(normalized, self._entity_id(text))
     
-    def add_triple(self, subject: str, predicate: str, obj: str, 
-                   confidence: float, provenance: ProvenanceInfo):
-        subject_id = self.get_canonical_id(subject)
-        object_id = self.get_canonical_id(obj)
-        
-        subject_uri = URIRef(self.PKG[subject_id])
-        predicate_uri = URIRef(self.PKG[predicate])
-        object_uri = URIRef(self.PKG[object_id])
-        
-        self.graph.add((subject_uri, predicate_uri, object_uri))
-        self.graph.add((subject_uri, RDFS.label, Literal(subject)))
-        self.graph.add((object_uri, RDFS.label, Literal(obj)))
-        
-        triple_key = f"{subject_id}:{predicate}:{object_id}"
-        self.provenance_store[triple_key] = {
-            "subject": subject,
-            "predicate": predicate,
-            "object": obj,
-            "confidence": confidence,
-            "provenance": provenance.to_dict()
-        }
+    def _intern_entity(self, entity_id: str, label: Optional[str] = None) -> int:
+        entity = self.entities.intern(entity_id)
+        if entity == len(self.entity_labels):
+            self.entity_labels.append(label or "")
+        elif label and not self.entity_labels[entity]:
+            self.entity_labels[entity] = label
+        return entity
     
-    def get_entity_info(self, entity_id: str) -> Optional[Dict]:
-        entity_uri = URIRef(self.PKG[entity_id])
-        
-        if (entity_uri, None, None) not in self.graph and (None, None, entity_uri) not in self.graph:
+    def _resolve_entity(self, text: str) -> int:
+        normalized = self._normalize_entity(text)
+        entity = self._surface_cache.get(normalized)
+        if entity is None:
+            entity_id = self.get_canonical_id(text)
+            if self.entities.get(entity_id) is None:
+                entity_id = self._match_entity(text, entity_id)
+            entity = self._intern_entity(entity_id)
+            self._surface_cache[normalized] = entity
+        if not self.entity_labels[entity]:
+            self.entity_labels[entity] = text
+        return entity
+    
+    def _ensure_resolver(self) -> Optional[EntityResolver]:
+        if self.match_threshold <= 0:
             return None
+        if self._resolver is None:
+            with timed("graph", "build_resolver"):
+                self._resolver = self._build_resolver()
+        return self._resolver
+    
+    def _build_resolver(self) -> EntityResolver:
+        resolver = EntityResolver(threshold=self.match_threshold)
+        for entity in self._entities_by_weight():
+            if self.entity_labels[entity]:
+                resolver.add(self.entities.term(entity), self.entity_labels[entity])
+        return resolver
+    
+    def _entities_by_weight(self) -> List[int]:
+        return sorted(self._entity_refs, key=lambda entity: (-self._entity_refs[entity], len(self.entity_labels[entity])))
+    
+    def _match_entity(self, text: str, entity_id: str) -> str:
+        resolver = self._ensure_resolver()
+        if resolver is None:
+            return entity_id
         
-        label = None
-        for s, p, o in self.graph.triples((entity_uri, RDFS.label, None)):
-            label = str(o)
-            break
-        
-        relations = []
-        for s, p, o in self.graph.triples((entity_uri, None, None)):
-            if p != RDFS.label:
-                obj_label = self._get_label(o)
-                relations.append({
-                    "predicate": str(p).replace(str(self.PKG), ""),
-                    "object": obj_label,
-                    "object_id": str(o).replace(str(self.PKG), "")
-                })
+        with timed("graph", "resolve_entity"):
+            match = resolver.find(text)
+        if match is None:
+            resolver.add(entity_id, text)
+            return entity_id
         
-        for s, p, o in self.graph.triples((None, None, entity_uri)):
-            if p != RDFS.label:
-                subj_label = self._get_label(s)
-                relations.append({
-                    "predicate": str(p).replace(str(self.PKG), "") + "_inverse",
-                    "object": subj_label,
-                    "object_id": str(s).replace(str(self.PKG), "")
+        self.add_alias(text, match[0])
+        ENTITY_RESOLUTIONS.inc(mode="incremental")
+        return match[0]
+    
+    def resolve_entities(self, threshold: Optional[float] = None, dry_run: bool = False) -> List[Dict]:
+        with self._write_lock, timed("graph", "resolve_entities"):
+            resolver = EntityResolver(threshold=threshold or self.match_threshold or DEFAULT_MATCH_THRESHOLD)
+            merges = []
+            for entity in self._entities_by_weight():
+                entity_id, label = self.entities.term(entity), self.entity_labels[entity]
+                if not label:
+                    continue
+                match = resolver.find(label)
+                if match is None:
+                    resolver.add(entity_id, label)
+                    continue
+                resolver.add(match[0], label)
+                merges.append({
+                    "source_id": entity_id,
+                    "source_label": label,
+                    "target_id": match[0],
+                    "target_label": self._label(self.entities.get(match[0])),
+                    "score": round(match[1], 4)
                 })
+            
+            if not dry_run:
+                with self.batch():
+                    for merge in merges:
+                        self.merge_entities(merge["source_id"], merge["target_id"])
+                ENTITY_RESOLUTIONS.inc(len(merges), mode="batch")
+                self._resolver = None
+            return merges
+    
+    def add_triple(self, subject: str, predicate: str, obj: str,
+                   confidence: float, provenance: ProvenanceInfo):
+        with self._write_lock, timed("graph", "add_triple"):
+            self._insert(self._resolve_entity(subject), self.predicates.intern(predicate),
+                         self._resolve_entity(obj), subject, obj, confidence, provenance)
+            if not self._batch_depth:
+                self._publish()
+    
+    def add_triples(self, triples: Iterable[Tuple[str, str, str, float, ProvenanceInfo]]) -> int:
+        added = 0
+        with self._write_lock, timed("graph", "add_triples"):
+            for subject, predicate, obj, confidence, provenance in triples:
+                self._insert(self._resolve_entity(subject), self.predicates.intern(predicate),
+                             self._resolve_entity(obj), subject, obj, confidence, provenance)
+                added += 1
+            if added and not self._batch_depth:
+                self._publish()
+        return added
+    
+    @contextmanager
+    def batch(self):
+        with self._write_lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._publish()
+    
+    @contextmanager
+    def bulk_load(self):
+        with self.batch():
+            self._ensure_indexes()
+            self._deferred = True
+            try:
+                yield self
+            finally:
+                self._deferred = False
+                self._ensure_indexes()
+    
+    def _publish(self):
+        self._version += 1
+        self._published = (len(self._s), self._version)
+    
+    def _visible(self, rows: List[int], view) -> List[int]:
+        limit, version = view
+        deleted_at = self._deleted_at
+        return [row for row in rows if row < limit and deleted_at[row] > version]
+    
+    def _insert(self, s: int, p: int, o: int, subject: str, obj: str,
+                confidence: float, provenance: ProvenanceInfo):
+        source = self.sources.intern(provenance.source)
+        key = triple_id(s, p, o)
         
-        aliases = [k for k, v in self.alias_table.items() if v == entity_id]
+        previous = self._rows.get(key)
+        if previous is not None:
+            self._tombstone(previous)
         
-        sources = set()
-        for triple_key, prov_data in self.provenance_store.items():
-            if entity_id in triple_key:
-                sources.add(prov_data["provenance"]["source"])
+        row = len(self._s)
+        self._s.append(s)
+        self._p.append(p)
+        self._o.append(o)
+        self._subject_surface.append(self.surfaces.intern(subject))
+        self._object_surface.append(self.surfaces.intern(obj))
+        self._confidence.append(confidence)
+        self._source.append(source)
+        self._start.append(provenance.start)
+        self._end.append(provenance.end)
+        if provenance.document >= 0:
+            self._snippet.append("")
+        else:
+            self._snippet.append(provenance.snippet)
+        self._document.append(provenance.document)
+        self._snippet_start.append(provenance.snippet_start)
+        self._snippet_end.append(provenance.snippet_end)
+        self._sentence_start.append(provenance.sentence_start)
+        self._sentence_end.append(provenance.sentence_end)
+        self._deleted_at.append(NEVER_DELETED)
+        self._live_rows += 1
         
+        self._rows[key] = row
+        if not self._deferred:
+            self._out.setdefault(s, []).append(row)
+            self._in.setdefault(o, []).append(row)
+            self._by_predicate.setdefault(p, []).append(row)
+            self._indexed_rows = len(self._s)
+        
+        self._count_triple(s, p, o, source, 1)
+    
+    def _tombstone(self, row: int):
+        s, p, o = self._s[row], self._p[row], self._o[row]
+        self._count_triple(s, p, o, self._source[row], -1)
+        self._deleted_at[row] = self._version + 1
+        self._live_rows -= 1
+        key = triple_id(s, p, o)
+        if self._rows.get(key) == row:
+            del self._rows[key]
+    
+    def delete_source(self, source: str) -> List[Dict]:
+        with self._write_lock, timed("graph", "delete"):
+            source_id = self.sources.get(source)
+            if source_id is None:
+                return []
+            rows = [row for row, (src, deleted_at) in enumerate(zip(self._source, self._deleted_at))
+                    if src == source_id and deleted_at == NEVER_DELETED]
+            return self._delete_rows(rows)
+    
+    def delete_triple(self, subject: str, predicate: str, obj: str) -> List[Dict]:
+        with self._write_lock, timed("graph", "delete"):
+            s = self.entities.get(self.get_canonical_id(subject))
+            p = self.predicates.get(predicate)
+            o = self.entities.get(self.get_canonical_id(obj))
+            if s is None or p is None or o is None:
+                return []
+            row = self._rows.get(triple_id(s, p, o))
+            if row is None:
+                return []
+            return self._delete_rows([row])
+    
+    def _delete_rows(self, rows: List[int]) -> List[Dict]:
+        deleted = []
+        for row in rows:
+            deleted.append(self._row_dict(row))
+            self._tombstone(row)
+        if deleted and not self._batch_depth:
+            self._publish()
+        return deleted
+    
+    def merge_entities(self, source_id: str, target_id: str) -> int:
+        with self._write_lock, timed("graph", "merge"):
+            src = self.entities.get(source_id)
+            dst = self.entities.get(target_id)
+            if src is None or dst is None or src == dst:
+                return 0
+            
+            surfaces = {self._normalize_entity(self._label(src))}
+            surfaces.update(self._aliases_by_entity.get(source_id, []))
+            surfaces.update(text for text, entity in self._surface_cache.items() if entity == src)
+            
+            moved = 0
+            with self.batch():
+                for row in sorted(set(self._out.get(src, []) + self._in.get(src, []))):
+                    if self._deleted_at[row] != NEVER_DELETED:
+                        continue
+                    s, o = self._s[row], self._o[row]
+                    subject = self.surfaces.term(self._subject_surface[row])
+                    obj = self.surfaces.term(self._object_surface[row])
+                    if s == src:
+                        surfaces.add(self._normalize_entity(subject))
+                    if o == src:
+                        surfaces.add(self._normalize_entity(obj))
+                    
+                    provenance = self._provenance(row)
+                    self._tombstone(row)
+                    s, o = (dst if s == src else s), (dst if o == src else o)
+                    if s != o:
+                        self._insert(s, self._p[row], o, subject, obj, self._confidence[row], provenance)
+                    moved += 1
+                
+                for text in surfaces:
+                    self._set_alias(text, target_id)
+                    self._surface_cache.pop(text, None)
+                if self._resolver is not None:
+                    self._resolver.remove(source_id)
+                    if self.entity_labels[src]:
+                        self._resolver.add(target_id, self.entity_labels[src])
+                if not self.entity_labels[dst]:
+                    self.entity_labels[dst] = self.entity_labels[src]
+            return moved
+    
+    def get_tombstone_count(self) -> int:
+        return len(self._s) - self._live_rows
+    
+    def _triple_key(self, row: int) -> str:
+        return (f"{self.entities.term(self._s[row])}:{self.predicates.term(self._p[row])}:"
+                f"{self.entities.term(self._o[row])}")
+    
+    def _provenance(self, row: int) -> ProvenanceInfo:
+        return ProvenanceInfo(self.sources.term(self._source[row]), self.snippet(row), self._start[row],
+                              self._end[row], self._document[row], self._snippet_start[row], self._snippet_end[row],
+                              self._sentence_start[row], self._sentence_end[row])
+    
+    def snippet(self, row: int) -> str:
+        document = self._document[row]
+        if document < 0:
+            return self._snippet[row]
+        return self.documents.text(document, self._snippet_start[row], self._snippet_end[row])
+    
+    def live_documents(self) -> Set[int]:
+        limit, version = self._published
+        return {document for document, deleted_at in zip(self._document[:limit], self._deleted_at[:limit])
+                if document >= 0 and deleted_at > version}
+    
+    def _row_dict(self, row: int) -> Dict:
         return {
-            "entity_id": entity_id,
-            "label": label or entity_id,
-            "aliases": aliases,
-            "relations": relations,
-            "sources": list(sources)
+            "subject": self.surfaces.term(self._subject_surface[row]),
+            "predicate": self.predicates.term(self._p[row]),
+            "object": self.surfaces.term(self._object_surface[row]),
+            "confidence": self._confidence[row],
+            "provenance": self._provenance(row).to_dict()
         }
     
-    def _get_label(self, uri) -> str:
-        for s, p, o in self.graph.triples((uri, RDFS.label, None)):
-            return str(o)
-        return str(uri).replace(str(self.PKG), "")
+    def _label(self, entity: int) -> str:
+        return self.entity_labels[entity] or self.entities.term(entity)
+    
+    def get_entity_info(self, entity_id: str, limit: Optional[int] = None) -> Optional[Dict]:
+        with timed("graph", "entity_info"):
+            view = self._published
+            entity = self.entities.get(entity_id)
+            if entity is None or entity not in self._entity_refs:
+                return None
+            out_rows = self._visible(self._out.get(entity, []), view)
+            in_rows = self._visible(self._in.get(entity, []), view)
+            
+            neighbours = [(row, self._o[row], "") for row in out_rows]
+            neighbours.extend((row, self._s[row], "_inverse") for row in in_rows)
+            
+            centrality = self.centrality
+            if centrality is not None:
+                neighbours.sort(key=lambda item: centrality.score(item[1]), reverse=True)
+            
+            relations = []
+            for row, other, suffix in neighbours[:limit]:
+                relation = {
+                    "predicate": self.predicates.term(self._p[row]) + suffix,
+                    "object": self._label(other),
+                    "object_id": self.entities.term(other)
+                }
+                if centrality is not None:
+                    relation["centrality"] = round(centrality.score(other), 4)
+                relations.append(relation)
+            
+            sources = set()
+            for row in out_rows + in_rows:
+                sources.add(self.sources.term(self._source[row]))
+            
+            info = {
+                "entity_id": entity_id,
+                "label": self._label(entity),
+                "aliases": list(self._aliases_by_entity.get(entity_id, [])),
+                "relations": relations,
+                "relation_count": len(neighbours),
+                "sources": list(sources)
+            }
+            if centrality is not None:
+                info["centrality"] = centrality.entity_stats(entity)
+            return info
+    
+    def entity_centrality(self, text: str) -> float:
+        centrality = self.centrality
+        if centrality is None:
+            return 0.0
+        return centrality.score(self.entities.get(self.get_canonical_id(text)))
+    
+    def edge_arrays(self, view=None) -> Tuple[np.ndarray, np.ndarray]:
+        limit, version = view or self._published
+        live = np.frombuffer(self._deleted_at[:limit], dtype=np.int64) > version
+        subjects = np.frombuffer(self._s[:limit], dtype=np.int64)[live]
+        objects = np.frombuffer(self._o[:limit], dtype=np.int64)[live]
+        return subjects, objects
+    
+    def entity_ids(self) -> List[str]:
+        return list(self.entities.terms)
+    
+    def entity_index(self, entity_id: str) -> int:
+        entity = self.entities.get(entity_id)
+        return -1 if entity is None else entity
+    
+    def _live_row_ids(self, view=None) -> Iterator[int]:
+        limit, version = view or self._published
+        deleted_at = self._deleted_at
+        return (row for row in range(limit) if deleted_at[row] > version)
     
     def get_all_triples(self) -> List[Dict]:
-        results = []
-        for triple_key, prov_data in self.provenance_store.items():
-            results.append(prov_data)
-        return results
+        return [self._row_dict(row) for row in self._live_row_ids()]
+    
+    def get_row_count(self) -> int:
+        return self._published[0]
     
-    def search_triples(self, query_terms: List[str]) -> List[Dict]:
+    def get_triples_since(self, start_row: int) -> List[Dict]:
+        limit, version = self._published
+        deleted_at = self._deleted_at
+        return [self._row_dict(row) for row in range(start_row, limit) if deleted_at[row] > version]
+    
+    def search_triples(self, query_terms: List[str], limit: Optional[int] = None) -> List[Dict]:
         results = []
         query_lower = [t.lower() for t in query_terms]
         
-        for triple_key, prov_data in self.provenance_store.items():
-            text = f"{prov_data['subject']} {prov_data['predicate']} {prov_data['object']} {prov_data['provenance']['snippet']}"
-            text_lower = text.lower()
-            
-            if any(term in text_lower for term in query_lower):
-                results.append(prov_data)
+        with timed("graph", "search_triples"):
+            limit_rows, version = self._published
+            predicate_text = [term.lower() for term in self.predicates.terms]
+            surface_text = [term.lower() for term in self.surfaces.terms]
+            columns = zip(range(limit_rows), self._subject_surface, self._p, self._object_surface,
+                          self._deleted_at)
+            for row, subject, predicate, obj, deleted_at in columns:
+                if deleted_at <= version:
+                    continue
+                text_lower = f"{surface_text[subject]} {predicate_text[predicate]} {surface_text[obj]}"
+                
+                if (any(term in text_lower for term in query_lower) or
+                        any(term in self.snippet(row).lower() for term in query_lower)):
+                    results.append(self._row_dict(row))
+                    if limit is not None and len(results) >= limit:
+                        break
         
         return results
     
+    def view(self):
+        return self._published
+    
+    def term_id(self, term: str, predicate: bool = False) -> Optional[int]:
+        if predicate:
+            return self.predicates.get(term)
+        entity = self.entities.get(term)
+        if entity is None or entity not in self._entity_refs:
+            return None
+        return entity
+    
+    def cardinality(self, s: Optional[int], p: Optional[int], o: Optional[int]) -> int:
+        counts = [self._live_rows]
+        if s is not None:
+            counts.append(len(self._out.get(s, ())))
+        if o is not None:
+            counts.append(len(self._in.get(o, ())))
+        if p is not None:
+            counts.append(self._predicate_counts.get(p, 0))
+        return min(counts)
+    
+    def fanout(self, p: Optional[int]) -> float:
+        rows = self._predicate_counts.get(p, 0) if p is not None else self._live_rows
+        return rows / max(1, len(self._entity_refs))
+    
+    def scan(self, s: Optional[int], p: Optional[int], o: Optional[int], view=None) -> Iterator[int]:
+        limit, version = view or self._published
+        if s is not None and (o is None or len(self._out.get(s, ())) <= len(self._in.get(o, ()))):
+            rows = self._out.get(s, ())
+        elif o is not None:
+            rows = self._in.get(o, ())
+        elif p is not None:
+            rows = self._by_predicate.get(p, ())
+        else:
+            rows = range(limit)
+        
+        subjects, predicates, objects, deleted_at = self._s, self._p, self._o, self._deleted_at
+        for row in rows:
+            if row >= limit or deleted_at[row] <= version:
+                continue
+            if ((s is None or subjects[row] == s) and (p is None or predicates[row] == p)
+                    and (o is None or objects[row] == o)):
+                yield row
+    
+    def row_terms(self, row: int) -> Tuple[int, int, int]:
+        return self._s[row], self._p[row], self._o[row]
+    
+    def entity_term(self, entity: int) -> Dict:
+        return {"id": self.entities.term(entity), "label": self._label(entity)}
+    
+    def predicate_term(self, predicate: int) -> str:
+        return self.predicates.term(predicate)
+    
     def get_triple_count(self) -> int:
-        return len(self.provenance_store)
+        return self._live_rows
+    
+    def get_entity_count(self) -> int:
+        return len(self._entity_refs)
+    
+    def _count_triple(self, s: int, p: int, o: int, source: int, delta: int):
+        _bump(self._entity_refs, s, delta)
+        _bump(self._entity_refs, o, delta)
+        _bump(self._predicate_counts, p, delta)
+        _bump(self._source_counts, source, delta)
+    
+    def get_stats(self, detailed: bool = False) -> Dict:
+        stats = {
+            "triples": self._live_rows,
+            "entities": len(self._entity_refs),
+            "predicates": len(self._predicate_counts),
+            "sources": len(self._source_counts)
+        }
+        if detailed:
+            stats["predicate_counts"] = {self.predicates.term(p): n for p, n in list(self._predicate_counts.items())}
+            stats["source_counts"] = {self.sources.term(src): n for src, n in list(self._source_counts.items())}
+        return stats
+    
+    def iter_turtle(self) -> Iterator[str]:
+        yield f"@prefix pkg: <{PKG_NAMESPACE}> .\n"
+        yield "@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n\n"
+        
+        labels = set()
+        for row in self._live_row_ids():
+            s, o = self._s[row], self._o[row]
+            yield (f"{_uri(self.entities.term(s))} {_uri(self.predicates.term(self._p[row]))} "
+                   f"{_uri(self.entities.term(o))} .\n")
+            labels.add((s, self._subject_surface[row]))
+            labels.add((o, self._object_surface[row]))
+        
+        for entity, surface in sorted(labels):
+            yield f"{_uri(self.entities.term(entity))} rdfs:label {_literal(self.surfaces.term(surface))} .\n"
+    
+    def iter_json(self) -> Iterator[str]:
+        yield "{"
+        for index, row in enumerate(self._live_row_ids()):
+            yield ("," if index else "") + f"\n  {json.dumps(self._triple_key(row))}: {json.dumps(self._row_dict(row))}"
+        yield "\n}\n"
+    
+    def export_json(self, path: Path):
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.writelines(self.iter_json())
+        os.replace(tmp_path, path)
+    
+    def export_turtle(self, path: Path):
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.writelines(self.iter_turtle())
+        os.replace(tmp_path, path)
+    
+    def import_turtle(self, path: Path, source: Optional[str] = None):
+        from rdflib import Graph
+        from rdflib.namespace import RDFS
+        
+        graph = Graph()
+        graph.parse(str(path), format="turtle")
+        
+        labels = {}
+        for s, _, o in graph.triples((None, RDFS.label, None)):
+            labels.setdefault(str(s), str(o))
+        
+        provenance = ProvenanceInfo(source or Path(path).name, "", 0, 0)
+        with self.batch():
+            for s, p, o in graph:
+                if p == RDFS.label or not str(p).startswith(PKG_NAMESPACE):
+                    continue
+                subject_id = str(s).replace(PKG_NAMESPACE, "")
+                object_id = str(o).replace(PKG_NAMESPACE, "")
+                subject = labels.get(str(s), subject_id)
+                obj = labels.get(str(o), object_id)
+                self._insert(self._intern_entity(subject_id, subject),
+                             self.predicates.intern(str(p).replace(PKG_NAMESPACE, "")),
+                             self._intern_entity(object_id, obj),
+                             subject, obj, 1.0, provenance)
+
+
+def _uri(local_name: str) -> str:
+    return f"<{PKG_NAMESPACE}{local_name}>"
+
+
+def _literal(text: str) -> str:
+    escaped = (text.replace("\\", "\\\\").replace('"', '\\"')
+               .replace("\n", "\\n").replace("\r", "\\r"))
+    return f'"{escaped}"'
+
+
+def _counts_to_array(counts: Dict[int, int], size: int) -> array:
+    values = array('q', bytes(8 * size))
+    for key, count in counts.items():
+        values[key] = count
+    return values
+
+
+def _counts_from_array(values: array) -> Dict[int, int]:
+    return {key: count for key, count in enumerate(values) if count}
+
+
+def _bump(counts: Dict, key, delta: int):
+    value = counts.get(key, 0) + delta
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
@@ -1,8 +1,20 @@
 import re
 import uuid
+from bisect import bisect_right
+from itertools import accumulate
 from typing import List, Dict, Tuple, Optional
 from pathlib import Path
 from src.graph_store import GraphStore, ProvenanceInfo
+from src.metrics import REGISTRY, timed
+
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+INGESTED_ITEMS = REGISTRY.counter(
+    "pkg_ingested_items_total",
+    "Files, chunks and triples processed by the ingester.",
+    ("kind",)
+)
 
 
 class IngestionJob:
@@ -19,57 +31,56 @@ class TextChunker:
         self.chunk_size = chunk_size
         self.overlap = overlap
     
-    def chunk_text(self, text: str, source: str) -> List[Dict]:
+    def chunk_text(self, text: str, source: str, document: int = -1) -> List[Dict]:
         sentences = self._split_sentences(text)
+        offsets = list(accumulate((len(sentence) + 1 for sentence in sentences), initial=0))
         chunks = []
         
-        current_chunk = []
+        first = 0
         current_length = 0
-        chunk_start = 0
         
-        for sentence in sentences:
+        for index, sentence in enumerate(sentences):
             sentence_length = len(sentence.split())
             
-            if current_length + sentence_length > self.chunk_size and current_chunk:
-                chunk_text = " ".join(current_chunk)
-                chunks.append({
-                    "text": chunk_text,
-                    "source": source,
-                    "start": chunk_start,
-                    "end": chunk_start + len(chunk_text)
-                })
+            if current_length + sentence_length > self.chunk_size and index > first:
+                chunks.append(self._chunk(sentences, offsets, first, index, source, document))
                 
-                overlap_words = []
+                overlap_start = index
                 overlap_length = 0
-                for s in reversed(current_chunk):
-                    if overlap_length + len(s.split()) <= self.overlap:
-                        overlap_words.insert(0, s)
-                        overlap_length += len(s.split())
-                    else:
+                while overlap_start > first:
+                    words = len(sentences[overlap_start - 1].split())
+                    if overlap_length + words > self.overlap:
                         break
+                    overlap_start -= 1
+                    overlap_length += words
                 
-                current_chunk = overlap_words
+                first = overlap_start
                 current_length = overlap_length
-                if not overlap_words:
-                    chunk_start = chunk_start + len(chunk_text)
             
-            current_chunk.append(sentence)
             current_length += sentence_length
         
-        if current_chunk:
-            chunk_text = " ".join(current_chunk)
-            chunks.append({
-                "text": chunk_text,
-                "source": source,
-                "start": chunk_start,
-                "end": chunk_start + len(chunk_text)
-            })
+        if first < len(sentences):
+            chunks.append(self._chunk(sentences, offsets, first, len(sentences), source, document))
         
         return chunks
     
+    def _chunk(self, sentences: List[str], offsets: List[int], first: int, last: int,
+               source: str, document: int) -> Dict:
+        chunk_text = " ".join(sentences[first:last])
+        return {
+            "text": chunk_text,
+            "source": source,
+            "document": document,
+            "start": offsets[first],
+            "end": offsets[first] + len(chunk_text)
+        }
+    
+    def normalize(self, text: str) -> str:
+        return re.sub(r'\s+', ' ', text).strip()
+    
     def _split_sentences(self, text: str) -> List[str]:
         text = re.sub(r'\s+', ' ', text)
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        sentences = SENTENCE_BOUNDARY.split(text)
         return [s.strip() for s in sentences if s.strip()]
 
 
@@ -86,8 +97,32 @@ class EntityExtractor:
             (r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:wrote|writes|written)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', 'writes'),
         ]
     
+    def _sentences(self, text: str) -> Tuple[List[int], List[int]]:
+        boundaries = list(SENTENCE_BOUNDARY.finditer(text))
+        starts = [0] + [boundary.end() for boundary in boundaries]
+        ends = [boundary.start() for boundary in boundaries] + [len(text)]
+        return starts, ends
+    
+    def _provenance(self, chunk: Dict, sentences: Tuple[List[int], List[int]], match,
+                    snippet_start: int, snippet_end: int) -> ProvenanceInfo:
+        starts, ends = sentences
+        sentence = bisect_right(starts, match.start()) - 1
+        offset = chunk["start"]
+        return ProvenanceInfo(
+            source=chunk["source"],
+            snippet=chunk["text"][snippet_start:snippet_end],
+            start=offset + match.start(),
+            end=offset + match.end(),
+            document=chunk.get("document", -1),
+            snippet_start=offset + snippet_start,
+            snippet_end=offset + snippet_end,
+            sentence_start=offset + starts[sentence],
+            sentence_end=offset + ends[sentence]
+        )
+    
     def extract_triples(self, chunk: Dict) -> List[Tuple[str, str, str, float, ProvenanceInfo]]:
         text = chunk["text"]
+        sentences = self._sentences(text)
         triples = []
         
         for pattern, relation in self.patterns:
@@ -97,21 +132,18 @@ class EntityExtractor:
                 obj = match.group(2).strip()
                 
                 if subject and obj and subject != obj:
-                    snippet = text[max(0, match.start()-50):min(len(text), match.end()+50)]
-                    provenance = ProvenanceInfo(
-                        source=chunk["source"],
-                        snippet=snippet,
-                        start=chunk["start"] + match.start(),
-                        end=chunk["start"] + match.end()
-                    )
+                    snippet_start = max(0, match.start()-50)
+                    snippet_end = min(len(text), match.end()+50)
+                    provenance = self._provenance(chunk, sentences, match, snippet_start, snippet_end)
                     
                     triples.append((subject, relation, obj, 0.8, provenance))
         
-        triples.extend(self._extract_entities(chunk))
+        triples.extend(self._extract_entities(chunk, sentences))
         
         return triples
     
-    def _extract_entities(self, chunk: Dict) -> List[Tuple[str, str, str, float, ProvenanceInfo]]:
+    def _extract_entities(self, chunk: Dict,
+                          sentences: Tuple[List[int], List[int]]) -> List[Tuple[str, str, str, float, ProvenanceInfo]]:
         text = chunk["text"]
         triples = []
         
@@ -122,13 +154,9 @@ class EntityExtractor:
             entity = match.group(1).strip()
             
             if len(entity.split()) >= 2:
-                snippet = text[max(0, match.start()-30):min(len(text), match.end()+30)]
-                provenance = ProvenanceInfo(
-                    source=chunk["source"],
-                    snippet=snippet,
-                    start=chunk["start"] + match.start(),
-                    end=chunk["start"] + match.end()
-                )
+                snippet_start = max(0, match.start()-30)
+                snippet_end = min(len(text), match.end()+30)
+                provenance = self._provenance(chunk, sentences, match, snippet_start, snippet_end)
                 
                 for j in range(i+1, min(i+3, len(matches))):
                     other_entity = matches[j].group(1).strip()
@@ -156,6 +184,9 @@ class Ingester:
     def get_job(self, job_id: str) -> Optional[IngestionJob]:
         return self.jobs.get(job_id)
     
+    def get_active_job_count(self) -> int:
+        return sum(1 for job in list(self.jobs.values()) if job.status in ("queued", "processing"))
+    
     def ingest_file(self, file_path: Path, content: str, job_id: str) -> int:
         job = self.jobs.get(job_id)
         if not job:
@@ -164,18 +195,24 @@ class Ingester:
         job.status = "processing"
         
         try:
-            chunks = self.chunker.chunk_text(content, str(file_path))
+            with timed("ingest", "chunk"):
+                document = self.graph_store.documents.add(str(file_path), self.chunker.normalize(content))
+                chunks = self.chunker.chunk_text(content, str(file_path), document)
             
             triples_added = 0
-            for chunk in chunks:
-                triples = self.extractor.extract_triples(chunk)
-                for subject, predicate, obj, confidence, provenance in triples:
-                    self.graph_store.add_triple(subject, predicate, obj, confidence, provenance)
-                    triples_added += 1
+            with self.graph_store.batch():
+                for chunk in chunks:
+                    with timed("ingest", "extract"):
+                        triples = self.extractor.extract_triples(chunk)
+                    triples_added += self.graph_store.add_triples(triples)
             
             job.triples_count += triples_added
             job.files_processed += 1
             
+            INGESTED_ITEMS.inc(kind="files")
+            INGESTED_ITEMS.inc(len(chunks), kind="chunks")
+            INGESTED_ITEMS.inc(triples_added, kind="triples")
+            
             return triples_added
         except Exception as e:
             job.error = str(e)
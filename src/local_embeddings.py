@@ -0,0 +1,138 @@
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+TOKEN = re.compile(r"\w+")
+HASH_BITS = 20
+HASH_MASK = (1 << HASH_BITS) - 1
+TRANSFORM_BLOCK = 4096
+
+
+class LocalEncoder:
+    kind = "local"
+    
+    def __init__(self, sketch_dim: int = 512, components: int = 128, probes: int = 4,
+                 min_docs: int = 256, sample_size: int = 20000, seed: int = 0,
+                 df: Optional[np.ndarray] = None, n_docs: int = 0, mean: Optional[np.ndarray] = None,
+                 basis: Optional[np.ndarray] = None, fitted_docs: int = 0):
+        self.sketch_dim = sketch_dim
+        self.components = components
+        self.probes = probes
+        self.min_docs = min_docs
+        self.sample_size = sample_size
+        self.seed = seed
+        
+        self.df = df if df is not None else np.zeros(1 << HASH_BITS, dtype=np.int32)
+        self.n_docs = n_docs
+        self.mean = mean
+        self.basis = basis
+        self.fitted_docs = fitted_docs
+        
+        self._positions, self._signs = _projection(sketch_dim, probes, seed)
+    
+    @property
+    def dim(self) -> int:
+        return self.basis.shape[1] if self.basis is not None else self.sketch_dim
+    
+    def features(self, text: str) -> Counter:
+        tokens = TOKEN.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for token in tokens:
+            padded = f"<{token}>"
+            grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return Counter(zlib.crc32(gram.encode()) & HASH_MASK for gram in grams)
+    
+    def _sketch(self, features: Counter) -> np.ndarray:
+        if not features:
+            return np.zeros(self.sketch_dim, dtype=np.float32)
+        buckets = np.fromiter(features.keys(), dtype=np.intp, count=len(features))
+        counts = np.fromiter(features.values(), dtype=np.float64, count=len(features))
+        weights = (1.0 + np.log(counts)) * (np.log((1.0 + self.n_docs) / (1.0 + self.df[buckets])) + 1.0)
+        
+        vector = np.bincount(self._positions[buckets].ravel(),
+                             weights=(self._signs[buckets] * weights[:, None]).ravel(),
+                             minlength=self.sketch_dim)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm > 0 else vector).astype(np.float32)
+    
+    def sketch(self, texts: List[str]) -> np.ndarray:
+        rows = np.empty((len(texts), self.sketch_dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            rows[row] = self._sketch(self.features(text))
+        return rows
+    
+    def partial_fit(self, texts: List[str]) -> "LocalEncoder":
+        if not texts:
+            return self
+        buckets = np.fromiter((bucket for text in texts for bucket in self.features(text)), dtype=np.intp)
+        df = self.df.copy()
+        np.add.at(df, buckets, 1)
+        return LocalEncoder(self.sketch_dim, self.components, self.probes, self.min_docs, self.sample_size,
+                            self.seed, df=df, n_docs=self.n_docs + len(texts), mean=self.mean,
+                            basis=self.basis, fitted_docs=self.fitted_docs)
+    
+    def transform(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), TRANSFORM_BLOCK):
+            sketches = self.sketch(texts[start:start + TRANSFORM_BLOCK])
+            if self.basis is not None:
+                sketches = (sketches - self.mean) @ self.basis
+            vectors[start:start + TRANSFORM_BLOCK] = sketches
+        return vectors
+    
+    def needs_refit(self) -> bool:
+        if self.basis is None:
+            return self.n_docs >= self.min_docs
+        return self.n_docs >= 2 * self.fitted_docs
+    
+    def refit(self, texts: List[str]) -> "LocalEncoder":
+        sample = texts
+        if len(texts) > self.sample_size:
+            rng = np.random.default_rng(self.seed + self.n_docs)
+            sample = [texts[i] for i in rng.choice(len(texts), self.sample_size, replace=False)]
+        
+        sketches = self.sketch(sample).astype(np.float64)
+        mean = sketches.mean(axis=0)
+        centered = sketches - mean
+        eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+        basis = eigenvectors[:, ::-1][:, :min(self.components, len(sample))]
+        
+        return LocalEncoder(self.sketch_dim, self.components, self.probes, self.min_docs, self.sample_size,
+                            self.seed, df=self.df, n_docs=self.n_docs, mean=mean.astype(np.float32),
+                            basis=basis.astype(np.float32), fitted_docs=self.n_docs)
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        buckets = np.flatnonzero(self.df)
+        arrays = {
+            "config": np.array([self.sketch_dim, self.components, self.probes, self.min_docs,
+                                self.sample_size, self.seed, self.n_docs, self.fitted_docs]),
+            "df_buckets": buckets.astype(np.int32),
+            "df_counts": self.df[buckets]
+        }
+        if self.basis is not None:
+            arrays.update(mean=self.mean, basis=self.basis)
+        return arrays
+    
+    @classmethod
+    def from_arrays(cls, arrays) -> "LocalEncoder":
+        sketch_dim, components, probes, min_docs, sample_size, seed, n_docs, fitted_docs = \
+            (int(value) for value in arrays["config"])
+        df = np.zeros(1 << HASH_BITS, dtype=np.int32)
+        df[arrays["df_buckets"]] = arrays["df_counts"]
+        has_basis = "basis" in arrays
+        return cls(sketch_dim, components, probes, min_docs, sample_size, seed, df=df, n_docs=n_docs,
+                   mean=arrays["mean"] if has_basis else None, basis=arrays["basis"] if has_basis else None,
+                   fitted_docs=fitted_docs)
+
+
+@lru_cache(maxsize=4)
+def _projection(sketch_dim: int, probes: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(0, sketch_dim, (1 << HASH_BITS, probes)).astype(np.int16)
+    signs = rng.choice(np.array([-1, 1], dtype=np.int8), (1 << HASH_BITS, probes))
+    return positions, signs
@@ -1,12 +1,30 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from src.api_routes import router
+from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse
+from src.admission import AdmissionMiddleware, Overloaded
+from src.api_routes import ADMISSION_ROUTES, admission, router, stores, shards
+from src.metrics import REGISTRY
 from src.ui import get_ui_html
 
-app = FastAPI(title="Personal Knowledge Graph", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("PKG_LAZY_LOAD", "").lower() not in ("1", "true", "yes"):
+        stores.start()
+    yield
+    shards.stop()
+
+
+app = FastAPI(title="Personal Knowledge Graph", version="1.0.0", lifespan=lifespan)
 
 app.include_router(router, prefix="/api")
+app.add_middleware(AdmissionMiddleware, controller=admission, routes=ADMISSION_ROUTES)
+
+@app.exception_handler(Overloaded)
+async def overloaded(request, exc: Overloaded):
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -15,3 +33,12 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def ready():
+    status = stores.get_status()
+    return JSONResponse(status, status_code=200 if stores.is_ready() else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,239 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+from src.admission import Overloaded
+from src.metrics import current_trace
+
+
+PROFILE_HEADER = "x-profile"
+PROFILE_PARAM = "profile"
+
+current_profilers: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar("current_profilers", default=None)
+
+
+class RequestTrace:
+    __slots__ = ("stages",)
+    
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+    
+    def record(self, key: Tuple, elapsed: float):
+        name = ".".join(key)
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [elapsed, 1]
+        else:
+            stage[0] += elapsed
+            stage[1] += 1
+    
+    def to_dict(self) -> Dict:
+        return {name: {"ms": round(total * 1000, 3), "calls": calls}
+                for name, (total, calls) in self.stages.items()}
+    
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={total * 1000:.3f}" for name, (total, _) in self.stages.items())
+
+
+def summarize_profile(profilers: List[cProfile.Profile], limit: int = 30) -> List[Dict]:
+    stats = pstats.Stats(*profilers, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({function})",
+            "calls": nc,
+            "total_ms": round(tt * 1000, 3),
+            "cumulative_ms": round(ct * 1000, 3)
+        })
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+class ProfileStore:
+    def __init__(self, max_entries: int = 50):
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def add(self, record: Dict) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        record["profile_id"] = profile_id
+        with self._lock:
+            self._profiles[profile_id] = record
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile_id
+    
+    def get(self, profile_id: str) -> Optional[Dict]:
+        return self._profiles.get(profile_id)
+    
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [{k: v for k, v in record.items() if k != "functions"}
+                    for record in self._profiles.values()]
+
+
+class SlowRequestLog:
+    def __init__(self, threshold_ms: float = 1000.0, path: Optional[str] = None, max_entries: int = 100):
+        self.threshold_ms = threshold_ms
+        self.path = Path(path) if path else None
+        self.entries = deque(maxlen=max_entries)
+        self.store_sizes: Optional[Callable[[], Dict]] = None
+        self._lock = threading.Lock()
+    
+    def maybe_record(self, entry: Dict) -> bool:
+        if entry["duration_ms"] < self.threshold_ms:
+            return False
+        
+        if self.store_sizes is not None:
+            try:
+                entry["store_sizes"] = self.store_sizes()
+            except Exception as e:
+                print(f"Failed to read store sizes for slow request log: {e}")
+        
+        with self._lock:
+            self.entries.append(entry)
+            if self.path is not None:
+                try:
+                    with open(self.path, 'a') as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"Failed to write slow request log: {e}")
+        return True
+
+
+PROFILES = ProfileStore()
+SLOW_LOG = SlowRequestLog(
+    threshold_ms=float(os.getenv("PKG_SLOW_REQUEST_MS", "1000")),
+    path=os.getenv("PKG_SLOW_REQUEST_LOG",
+                   os.path.join(os.getenv("PKG_DATA_DIR", "data"), "slow_requests.jsonl"))
+)
+
+_profiler_lock = threading.Lock()
+
+
+def profiled_call(fn: Callable, *args):
+    profilers = current_profilers.get()
+    if profilers is None:
+        return fn(*args)
+    profiler = cProfile.Profile()
+    profilers.append(profiler)
+    return profiler.runcall(fn, *args)
+
+
+async def run_in_worker(fn: Callable, *args):
+    return await run_in_threadpool(profiled_call, fn, *args)
+
+
+def _truncate(value, limit: int = 200):
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit] + "..."
+    if isinstance(value, dict):
+        return {k: _truncate(v, limit) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_truncate(v, limit) for v in value[:20]]
+    return value
+
+
+async def _request_params(request: Request) -> Dict:
+    params = {
+        "path": dict(request.path_params),
+        "query": {k: v for k, v in request.query_params.items() if k != PROFILE_PARAM}
+    }
+    if request.headers.get("content-type", "").startswith("application/json"):
+        params["body"] = await request.body()
+    elif request.headers.get("content-length"):
+        params["content_length"] = int(request.headers["content-length"])
+    return params
+
+
+def _render_params(params: Dict) -> Dict:
+    if "body" not in params:
+        return params
+    rendered = {k: v for k, v in params.items() if k != "body"}
+    try:
+        rendered["body"] = _truncate(json.loads(params["body"] or b"null"))
+    except ValueError:
+        pass
+    return rendered
+
+
+def _wants_profile(request: Request) -> bool:
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_PARAM)
+    return flag is not None and flag.lower() not in ("", "0", "false", "no")
+
+
+class ProfiledRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+        
+        async def profiled_handler(request: Request):
+            params = await _request_params(request)
+            trace = RequestTrace()
+            token = current_trace.set(trace)
+            
+            profiler, profilers_token = None, None
+            if _wants_profile(request) and _profiler_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                profilers_token = current_profilers.set([profiler])
+            
+            start = time.perf_counter()
+            response, status_code = None, 500
+            try:
+                if profiler is not None:
+                    profiler.enable()
+                response = await original_handler(request)
+                status_code = response.status_code
+            except HTTPException as e:
+                status_code = e.status_code
+                raise
+            except Overloaded:
+                status_code = 429
+                raise
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    profilers = current_profilers.get()
+                    current_profilers.reset(profilers_token)
+                    _profiler_lock.release()
+                current_trace.reset(token)
+                duration_ms = (time.perf_counter() - start) * 1000
+                
+                if profiler is not None or duration_ms >= SLOW_LOG.threshold_ms:
+                    entry = {
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                        "method": request.method,
+                        "endpoint": self.path_format,
+                        "path": request.url.path,
+                        "params": _render_params(params),
+                        "status_code": status_code,
+                        "duration_ms": round(duration_ms, 3),
+                        "stages": trace.to_dict()
+                    }
+                    if profiler is not None:
+                        entry["functions"] = summarize_profile(profilers)
+                        profile_id = PROFILES.add(dict(entry))
+                        if response is not None:
+                            response.headers["X-Profile-Id"] = profile_id
+                            response.headers["Server-Timing"] = trace.server_timing()
+                    SLOW_LOG.maybe_record(entry)
+            
+            if profiler is None and _wants_profile(request):
+                response.headers["X-Profile-Skipped"] = "another request is being profiled"
+            return response
+        
+        return profiled_handler
@@ -0,0 +1,147 @@
+import numpy as np
+from typing import Dict, Optional
+
+
+BLOCK_ROWS = 65536
+SCORE_BLOCK_ROWS = 1024
+
+
+class ScalarQuantizer:
+    kind = "int8"
+    
+    def __init__(self, offset: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None):
+        self.offset = offset
+        self.scale = scale
+    
+    @property
+    def dim(self) -> int:
+        return len(self.offset)
+    
+    def fit(self, vectors: np.ndarray) -> "ScalarQuantizer":
+        low = np.asarray(vectors.min(axis=0), dtype=np.float64)
+        high = np.asarray(vectors.max(axis=0), dtype=np.float64)
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        self.scale = scale.astype(np.float32)
+        self.offset = (low + 128.0 * scale).astype(np.float32)
+        return self
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            codes[start:start + BLOCK_ROWS] = np.clip(np.rint((block - self.offset) / self.scale), -128, 127)
+        return codes
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.offset
+    
+    def dot(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        weights = (query * self.scale).astype(np.float32)
+        bias = float(self.offset @ query)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            end = start + SCORE_BLOCK_ROWS
+            scores[start:end] = codes[start:end].astype(np.float32) @ weights
+        return scores + bias
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"offset": self.offset, "scale": self.scale}
+    
+    @classmethod
+    def from_arrays(cls, arrays) -> "ScalarQuantizer":
+        return cls(arrays["offset"], arrays["scale"])
+
+
+class ProductQuantizer:
+    kind = "pq"
+    
+    def __init__(self, sub_dim: int = 8, centroids: Optional[np.ndarray] = None, dim: int = 0,
+                 iterations: int = 10, sample_size: int = 8192, seed: int = 0):
+        self.sub_dim = sub_dim
+        self.centroids = centroids
+        self._dim = dim
+        self.iterations = iterations
+        self.sample_size = sample_size
+        self.seed = seed
+    
+    @property
+    def dim(self) -> int:
+        return self._dim
+    
+    @property
+    def subspaces(self) -> int:
+        return len(self.centroids)
+    
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        padded = self.subspaces * self.sub_dim
+        if padded != vectors.shape[1]:
+            vectors = np.pad(vectors, ((0, 0), (0, padded - vectors.shape[1])))
+        return vectors.reshape(len(vectors), self.subspaces, self.sub_dim)
+    
+    def fit(self, vectors: np.ndarray) -> "ProductQuantizer":
+        rng = np.random.default_rng(self.seed)
+        self._dim = vectors.shape[1]
+        subspaces = -(-self._dim // self.sub_dim)
+        
+        sample = vectors
+        if len(vectors) > self.sample_size:
+            sample = vectors[np.sort(rng.choice(len(vectors), self.sample_size, replace=False))]
+        
+        clusters = min(256, len(sample))
+        self.centroids = np.zeros((subspaces, clusters, self.sub_dim), dtype=np.float32)
+        parts = self._split(sample)
+        for m in range(subspaces):
+            self.centroids[m] = _kmeans(parts[:, m, :], clusters, self.iterations, rng)
+        return self
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8, order='F')
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            parts = self._split(vectors[start:start + BLOCK_ROWS])
+            for m in range(self.subspaces):
+                codes[start:start + BLOCK_ROWS, m] = _nearest(parts[:, m, :], self.centroids[m])
+        return codes
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.centroids[np.arange(self.subspaces), codes]
+        return parts.reshape(len(codes), -1)[:, :self._dim]
+    
+    def dot(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        query_parts = self._split(query.reshape(1, -1))[0]
+        table = np.einsum("mkd,md->mk", self.centroids, query_parts)
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for m in range(self.subspaces):
+            scores += table[m].take(codes[:, m])
+        return scores
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids, "dim": np.array(self._dim), "sub_dim": np.array(self.sub_dim)}
+    
+    @classmethod
+    def from_arrays(cls, arrays) -> "ProductQuantizer":
+        return cls(sub_dim=int(arrays["sub_dim"]), centroids=arrays["centroids"], dim=int(arrays["dim"]))
+
+
+QUANTIZERS = {
+    ScalarQuantizer.kind: ScalarQuantizer,
+    ProductQuantizer.kind: ProductQuantizer
+}
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids * centroids).sum(axis=1) - 2.0 * points @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def _kmeans(points: np.ndarray, clusters: int, iterations: int, rng) -> np.ndarray:
+    centroids = points[rng.choice(len(points), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(points, centroids)
+        counts = np.bincount(assignments, minlength=clusters)
+        sums = np.stack([np.bincount(assignments, weights=points[:, d], minlength=clusters)
+                         for d in range(points.shape[1])], axis=1)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
@@ -0,0 +1 @@
+PKG_NAMESPACE = "http://pkg.local/"
@@ -0,0 +1,126 @@
+import contextvars
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from src.metrics import REGISTRY
+from src.profiling import profiled_call
+from src.store_manager import StoreManager
+
+
+DEFAULT_NAMESPACE = "default"
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+SHARD_EVENTS = REGISTRY.counter(
+    "pkg_shard_events_total",
+    "Shards loaded and evicted by the shard manager.",
+    ("event",)
+)
+
+
+class ShardManager:
+    def __init__(self, default: StoreManager, max_loaded: int = 8, query_threads: Optional[int] = None):
+        self.default = default
+        self.root = Path(default.data_dir) / "shards"
+        self.max_loaded = max_loaded
+        self.pool = ThreadPoolExecutor(max_workers=query_threads or min(8, os.cpu_count() or 1),
+                                       thread_name_prefix="shard-query")
+        
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        
+        REGISTRY.gauge("pkg_loaded_shards", "Namespace shards currently held in memory.").set_function(
+            lambda: len(self._loaded) + 1
+        )
+    
+    def validate(self, namespace: str) -> str:
+        if not NAMESPACE_PATTERN.match(namespace):
+            raise ValueError(f"Invalid namespace '{namespace}'")
+        return namespace
+    
+    def shard_dir(self, namespace: str) -> Path:
+        if namespace == DEFAULT_NAMESPACE:
+            return Path(self.default.data_dir)
+        return self.root / self.validate(namespace)
+    
+    def namespace_of(self, manager: StoreManager) -> str:
+        if manager is self.default:
+            return DEFAULT_NAMESPACE
+        return Path(manager.data_dir).name
+    
+    def namespaces(self) -> List[str]:
+        names = [DEFAULT_NAMESPACE]
+        if self.root.is_dir():
+            names.extend(sorted(path.name for path in self.root.iterdir()
+                                if path.is_dir() and NAMESPACE_PATTERN.match(path.name)))
+        return names
+    
+    def get(self, namespace: str, create: bool = False) -> StoreManager:
+        if namespace == DEFAULT_NAMESPACE:
+            return self.default
+        
+        with self._lock:
+            manager = self._loaded.get(namespace)
+            if manager is not None:
+                self._loaded.move_to_end(namespace)
+                return manager
+            
+            shard_dir = self.shard_dir(namespace)
+            if not shard_dir.is_dir():
+                if not create:
+                    raise KeyError(namespace)
+                shard_dir.mkdir(parents=True, exist_ok=True)
+            
+            manager = StoreManager(data_dir=str(shard_dir),
+                                   embedding_factory=self.default.embedding_factory,
+                                   poll_seconds=self.default.poll_seconds,
+                                   compact_ratio=self.default.compact_ratio,
+                                   analytics_delay=self.default.analytics_delay)
+            self._loaded[namespace] = manager
+            SHARD_EVENTS.inc(event="load")
+            self._evict()
+        manager.start()
+        return manager
+    
+    def _evict(self):
+        for namespace in list(self._loaded):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            manager = self._loaded[namespace]
+            if manager.write_lock.locked() or not manager.is_ready():
+                continue
+            manager.stop()
+            del self._loaded[namespace]
+            SHARD_EVENTS.inc(event="evict")
+    
+    def evict(self, namespace: str) -> bool:
+        with self._lock:
+            manager = self._loaded.pop(namespace, None)
+        if manager is None:
+            return False
+        manager.stop()
+        SHARD_EVENTS.inc(event="evict")
+        return True
+    
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return [DEFAULT_NAMESPACE] + list(self._loaded)
+    
+    def fan_out(self, managers: List[StoreManager], fn: Callable) -> list:
+        if len(managers) == 1:
+            return [fn(managers[0])]
+        futures = [self.pool.submit(contextvars.copy_context().run, profiled_call, fn, manager)
+                   for manager in managers]
+        return [future.result() for future in futures]
+    
+    def stop(self):
+        with self._lock:
+            managers = list(self._loaded.values())
+            self._loaded.clear()
+        for manager in managers:
+            manager.stop()
+        self.default.stop()
@@ -0,0 +1,117 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from src.metrics import REGISTRY
+
+
+MANIFEST_VERSION = 1
+
+LOCK_WAIT = REGISTRY.histogram(
+    "pkg_shared_lock_wait_seconds",
+    "Time spent waiting for cross-process data directory locks.",
+    ("lock",)
+)
+
+
+class FileLock:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+    
+    @contextmanager
+    def acquire(self, shared: bool = False):
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+        
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            with LOCK_WAIT.time(lock=self.path.stem):
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._local.depth = 1
+            try:
+                yield
+            finally:
+                self._local.depth = 0
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+class Manifest:
+    __slots__ = ("generation", "segments")
+    
+    def __init__(self, generation: int = 0, segments: Optional[Dict[str, int]] = None):
+        self.generation = generation
+        self.segments = segments or {}
+    
+    def changed_segments(self, other: "Manifest") -> list:
+        return [name for name, generation in self.segments.items()
+                if other.segments.get(name) != generation]
+    
+    def to_dict(self) -> Dict:
+        return {"version": MANIFEST_VERSION, "generation": self.generation, "segments": self.segments}
+
+
+class SharedState:
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        
+        self.manifest_path = self.data_dir / "manifest.json"
+        self.writer_lock = FileLock(self.data_dir / "writer.lock")
+        self.commit_lock = FileLock(self.data_dir / "commit.lock")
+        self._stamp = None
+    
+    def writer(self):
+        return self.writer_lock.acquire()
+    
+    def commit(self):
+        return self.commit_lock.acquire()
+    
+    def reading(self):
+        return self.commit_lock.acquire(shared=True)
+    
+    def read_manifest(self) -> Manifest:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return Manifest()
+        except Exception as e:
+            print(f"Failed to read manifest: {e}")
+            return Manifest()
+        return Manifest(data.get("generation", 0), data.get("segments", {}))
+    
+    def has_changed(self) -> bool:
+        try:
+            stat = os.stat(self.manifest_path)
+            stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        changed = stamp != self._stamp
+        self._stamp = stamp
+        return changed
+    
+    def publish(self, segments: Iterable[str]) -> Manifest:
+        with self.commit():
+            manifest = self.read_manifest()
+            manifest.generation += 1
+            for name in segments:
+                manifest.segments[name] = manifest.generation
+            
+            tmp_path = Path(f"{self.manifest_path}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest.to_dict(), f)
+            os.replace(tmp_path, self.manifest_path)
+            return manifest
@@ -0,0 +1,150 @@
+import mmap
+import os
+import struct
+from array import array
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+MAGIC = b"PKGSNAP1"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+SECTION = struct.Struct("<32sB1s6xQQQ")
+
+KIND_ARRAY = 0
+KIND_STRINGS = 1
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class StringTable:
+    __slots__ = ("_mm", "_offsets", "_blob_start", "_count")
+    
+    def __init__(self, mm, offset: int, count: int):
+        self._mm = mm
+        self._count = count
+        self._offsets = memoryview(mm)[offset:offset + 8 * (count + 1)].cast('q')
+        self._blob_start = offset + 8 * (count + 1)
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start = self._blob_start + self._offsets[index]
+        end = self._blob_start + self._offsets[index + 1]
+        return str(self._mm[start:end], 'utf-8')
+    
+    def __iter__(self) -> Iterator[str]:
+        mm, offsets, blob_start = self._mm, self._offsets, self._blob_start
+        for index in range(self._count):
+            yield str(mm[blob_start + offsets[index]:blob_start + offsets[index + 1]], 'utf-8')
+
+
+class StringColumn:
+    __slots__ = ("base", "base_len", "overrides", "tail")
+    
+    def __init__(self, base: Optional[StringTable] = None):
+        self.base = base
+        self.base_len = len(base) if base is not None else 0
+        self.overrides: Dict[int, str] = {}
+        self.tail: List[str] = []
+    
+    def __len__(self) -> int:
+        return self.base_len + len(self.tail)
+    
+    def __getitem__(self, index: int) -> str:
+        if index >= self.base_len:
+            return self.tail[index - self.base_len]
+        value = self.overrides.get(index)
+        if value is None:
+            value = self.base[index]
+        return value
+    
+    def __setitem__(self, index: int, value: str):
+        if index >= self.base_len:
+            self.tail[index - self.base_len] = value
+        else:
+            self.overrides[index] = value
+    
+    def append(self, value: str):
+        self.tail.append(value)
+    
+    def __iter__(self) -> Iterator[str]:
+        if self.base is not None:
+            if self.overrides:
+                for index, value in enumerate(self.base):
+                    yield self.overrides.get(index, value)
+            else:
+                yield from self.base
+        yield from self.tail
+
+
+class SnapshotReader:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a snapshot file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version} in {self.path}")
+        
+        self.sections = {}
+        for index in range(count):
+            name, kind, typecode, offset, length, nbytes = SECTION.unpack_from(
+                self._mm, HEADER.size + index * SECTION.size
+            )
+            self.sections[name.rstrip(b"\0").decode()] = (kind, typecode.decode(), offset, length, nbytes)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections
+    
+    def array(self, name: str) -> array:
+        kind, typecode, offset, length, nbytes = self.sections[name]
+        values = array(typecode)
+        values.frombytes(self._mm[offset:offset + nbytes])
+        return values
+    
+    def strings(self, name: str) -> StringTable:
+        kind, typecode, offset, length, nbytes = self.sections[name]
+        return StringTable(self._mm, offset, length)
+
+
+def _encode_strings(values: Iterable[str]) -> Tuple[bytes, int]:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = array('q', [0])
+    offsets.extend(accumulate(len(value) for value in encoded))
+    return offsets.tobytes() + b"".join(encoded), len(encoded)
+
+
+def write_snapshot(path: Path, arrays: Dict[str, array], strings: Dict[str, Iterable[str]]):
+    payloads = []
+    for name, values in arrays.items():
+        payloads.append((name, KIND_ARRAY, values.typecode, len(values), values.tobytes()))
+    for name, values in strings.items():
+        data, count = _encode_strings(values)
+        payloads.append((name, KIND_STRINGS, 'B', count, data))
+    
+    offset = _align(HEADER.size + SECTION.size * len(payloads))
+    table = []
+    for name, kind, typecode, length, data in payloads:
+        table.append(SECTION.pack(name.encode(), kind, typecode.encode(), offset, length, len(data)))
+        offset = _align(offset + len(data))
+    
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(payloads)))
+        f.write(b"".join(table))
+        for name, kind, typecode, length, data in payloads:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
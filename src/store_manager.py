@@ -0,0 +1,258 @@
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, TYPE_CHECKING
+
+from src.metrics import REGISTRY, timed
+from src.shared_state import Manifest, SharedState
+
+if TYPE_CHECKING:
+    from src.doc_store import DocumentStore
+    from src.embeddings import EmbeddingStore
+    from src.graph_store import GraphStore
+    from src.ingest import Ingester
+
+
+STORE_RELOADS = REGISTRY.counter(
+    "pkg_store_reloads_total",
+    "Store segments reloaded after another worker published a new generation.",
+    ("segment",)
+)
+
+ANALYTICS_FILE = "centrality.npz"
+
+
+class StoreManager:
+    def __init__(self, data_dir: str = "data",
+                 embedding_factory: Optional[Callable[[str, "DocumentStore"], "EmbeddingStore"]] = None,
+                 poll_seconds: float = 1.0, compact_ratio: float = 0.3, analytics_delay: float = 5.0):
+        self.data_dir = data_dir
+        self.embedding_factory = embedding_factory
+        self.poll_seconds = poll_seconds
+        self.compact_ratio = compact_ratio
+        self.analytics_delay = analytics_delay
+        self.analytics_path = Path(data_dir) / ANALYTICS_FILE
+        
+        self.shared = SharedState(data_dir)
+        self.manifest = Manifest()
+        
+        self.graph_store: Optional["GraphStore"] = None
+        self.embedding_store: Optional["EmbeddingStore"] = None
+        self.ingester: Optional["Ingester"] = None
+        
+        self.status = "idle"
+        self.error = None
+        self.load_seconds = None
+        
+        self.write_lock = threading.Lock()
+        
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._watcher = None
+        self._compactor = None
+        self._analytics = None
+        self._analytics_pending = False
+        self._stop = threading.Event()
+    
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.status = "loading"
+            self._thread = threading.Thread(target=self._load, name="store-loader", daemon=True)
+            self._thread.start()
+    
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            with timed("app", "load_stores"), self.shared.reading():
+                from src.ingest import Ingester
+                
+                self.shared.has_changed()
+                self.manifest = self.shared.read_manifest()
+                self.graph_store = self._new_graph_store()
+                self.embedding_store = self._new_embedding_store()
+                self.ingester = Ingester(self.graph_store)
+            self.status = "ready"
+            if self.graph_store.centrality is None and self.graph_store.get_triple_count():
+                self.schedule_analytics()
+            if self.poll_seconds > 0:
+                self._watcher = threading.Thread(target=self._watch, name="manifest-watcher", daemon=True)
+                self._watcher.start()
+        except Exception as e:
+            print(f"Failed to load stores: {e}")
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self._ready.set()
+    
+    def _new_graph_store(self) -> "GraphStore":
+        from src.graph_store import GraphStore
+        graph_store = GraphStore(data_dir=self.data_dir)
+        self._load_analytics(graph_store)
+        if self.embedding_store is not None:
+            self.embedding_store.documents = graph_store.documents
+        return graph_store
+    
+    def _load_analytics(self, graph_store: "GraphStore"):
+        from src.graph_analytics import CentralityScores
+        graph_store.centrality = CentralityScores.load(self.analytics_path, graph_store.entity_index)
+    
+    def _new_embedding_store(self) -> "EmbeddingStore":
+        if self.embedding_factory is not None:
+            return self.embedding_factory(self.data_dir, self.graph_store.documents)
+        from src.embeddings import EmbeddingStore
+        return EmbeddingStore(data_dir=self.data_dir, documents=self.graph_store.documents)
+    
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Failed to reload stores: {e}")
+    
+    def stop(self):
+        self._stop.set()
+    
+    def refresh(self) -> bool:
+        if not self.is_ready() or not self.shared.has_changed():
+            return False
+        with self.write_lock:
+            return self._reload()
+    
+    def _reload(self) -> bool:
+        with self.shared.reading():
+            manifest = self.shared.read_manifest()
+            changed = manifest.changed_segments(self.manifest)
+            if changed:
+                with timed("app", "reload_stores"):
+                    if "graph" in changed:
+                        self.graph_store = self._new_graph_store()
+                        self.ingester.graph_store = self.graph_store
+                    elif "analytics" in changed:
+                        self._load_analytics(self.graph_store)
+                    if "vectors" in changed:
+                        self.embedding_store = self._new_embedding_store()
+            self.manifest = manifest
+        
+        for segment in changed:
+            STORE_RELOADS.inc(segment=segment)
+        return bool(changed)
+    
+    @contextmanager
+    def writing(self):
+        with self.write_lock, self.shared.writer():
+            self.shared.has_changed()
+            self._reload()
+            yield
+    
+    @contextmanager
+    def committing(self, segments: Iterable[str]):
+        with self.shared.commit():
+            yield
+            self.manifest = self.shared.publish(segments)
+    
+    def needs_compaction(self) -> bool:
+        if not self.is_ready():
+            return False
+        graph_dead = self.graph_store.get_tombstone_count()
+        graph_total = graph_dead + self.graph_store.get_triple_count()
+        vector_dead = self.embedding_store.get_tombstone_count()
+        vector_total = vector_dead + self.embedding_store.get_vector_count()
+        return bool((graph_total and graph_dead / graph_total > self.compact_ratio) or
+                    (vector_total and vector_dead / vector_total > self.compact_ratio))
+    
+    def maybe_compact(self) -> bool:
+        with self._lock:
+            if not self.needs_compaction() or (self._compactor is not None and self._compactor.is_alive()):
+                return False
+            self._compactor = threading.Thread(target=self._compact, name="store-compactor", daemon=True)
+            self._compactor.start()
+            return True
+    
+    def _compact(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Failed to compact stores: {e}")
+    
+    def compact(self) -> Dict:
+        with self.writing(), timed("app", "compact"):
+            graph_dead = self.graph_store.get_tombstone_count()
+            vector_dead = self.embedding_store.compact()
+            with self.committing(("graph", "vectors")):
+                self.graph_store.save()
+                document_chars = self.graph_store.documents.compact(self.graph_store.live_documents())
+                self.embedding_store.save()
+            self.graph_store = self._new_graph_store()
+            self.ingester.graph_store = self.graph_store
+        return {"triples_removed": graph_dead, "vectors_removed": vector_dead,
+                "document_chars_removed": document_chars}
+    
+    def schedule_analytics(self) -> bool:
+        with self._lock:
+            self._analytics_pending = True
+            if self._analytics is not None:
+                return False
+            self._analytics = threading.Thread(target=self._run_analytics, name="graph-analytics", daemon=True)
+            self._analytics.start()
+            return True
+    
+    def _run_analytics(self):
+        while not self._stop.wait(self.analytics_delay):
+            with self._lock:
+                if not self._analytics_pending:
+                    self._analytics = None
+                    return
+                self._analytics_pending = False
+            try:
+                self.refresh_analytics()
+            except Exception as e:
+                print(f"Failed to refresh graph analytics: {e}")
+        with self._lock:
+            self._analytics = None
+    
+    def refresh_analytics(self) -> Dict:
+        from src.graph_analytics import compute_centrality
+        
+        with timed("app", "refresh_analytics"):
+            graph_store = self.graph_store
+            subjects, objects = graph_store.edge_arrays()
+            entity_ids = graph_store.entity_ids()
+            scores = compute_centrality(subjects, objects, len(entity_ids), previous=graph_store.centrality)
+            
+            with self.writing():
+                with self.committing(("analytics",)):
+                    scores.save(self.analytics_path, entity_ids)
+                if self.graph_store is graph_store:
+                    graph_store.centrality = scores
+                else:
+                    self._load_analytics(self.graph_store)
+        return scores.summary()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self.start()
+        return self._ready.wait(timeout) and self.status == "ready"
+    
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+    
+    def get_sizes(self) -> Dict:
+        if not self.is_ready():
+            return {"triples": 0, "entities": 0, "vectors": 0}
+        return {
+            "triples": self.graph_store.get_triple_count(),
+            "entities": self.graph_store.get_entity_count(),
+            "vectors": self.embedding_store.get_vector_count()
+        }
+    
+    def get_status(self) -> Dict:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "generation": self.manifest.generation
+        }